@@ -4,6 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
+import sammtools as st
 
 ###############################################################################
 # %% Example 4.10: Two-dimensional random walk 
@@ -21,6 +22,11 @@ D = 2*10**(-3)          # [mm2 s-1] Diffusion coefficient
 Dx = np.sqrt(2*D*DT)    # [mm] Standard deviation of the local step in x 
 Dy = Dx                 # [mm] Standard deviation of the local step in y
 
+# Parameters: Simulation
+seed = None             # [-] Seed of the random numbers, e.g. 42, for 
+                        #     reproducible results
+rng = np.random.default_rng(seed)
+
 # Parameters: Initial condition
 x = list(range(len(time)))
 y = list(range(len(time)))
@@ -31,8 +37,8 @@ x[0] = 0                                    # [mm] Local coordinate x
 y[0] = 0                                    # [mm] Local coordinate y
 
 for i in range(1, len(time)):
-    x[i] = x[i-1] + Dx*np.random.normal(0, 1) # [mm] Stochastic local step x
-    y[i] = y[i-1] + Dy*np.random.normal(0, 1) # [mm] Stochastic local step y
+    x[i] = x[i-1] + Dx*rng.normal(0, 1)     # [mm] Stochastic local step x
+    y[i] = y[i-1] + Dy*rng.normal(0, 1)     # [mm] Stochastic local step y
 
 ###############################################################################
 # %% Plots
@@ -50,21 +56,12 @@ plt.grid()
 
 # %% Plot Example 4.10, Fig. 4.7
 n = 1000
-distance_1d = list(range(len(time)))
-distance_mean = list(range(len(time)))
-distance_std = list(range(len(time)))
-distance_std_th = list(range(len(time)))
-distance_2d = np.zeros((n, len(time)))
+workers = 1             # [-] Number of parallel processes
 
-for a in range(0, n):
-    x[0] = 0
-    y[0] = 0
-    for b in range(1, len(time)):
-        distance_1d[b] = Dx*np.random.normal(0, 1)
-        distance_1d_cumsum = np.cumsum(distance_1d)
-    distance_2d[a, :] = distance_1d_cumsum
-distance_mean = np.mean(distance_2d, axis = 0)
-distance_std = np.std(distance_2d, axis = 0)
+# Mean and standard deviation of the distance of n particles, the 
+# trajectories are simulated in blocks and not stored
+distance_mean, distance_std = st.walk_envelope(n, len(time), Dx, seed=seed, 
+                                               workers=workers)
 distance_std_th = Dx*np.sqrt(time/DT)
 
 fig = plt.figure('Example 4.10, Fig. 4.7')
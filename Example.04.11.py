@@ -4,13 +4,13 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import tqdm as tq
+import sammtools as st
 
 ###############################################################################
 # %% Example 4.11: Random walk as a method for integration
 ###############################################################################
-# Please note that this simulation takes a long time.
-# To make it faster, reduce the number of particles to n = int(100) 
+# All particles are moved together in each time step. 
+# For a smoother curve, increase the number of particles to n = int(10**6)
 
 # Parameters: Time
 STARTTIME = 0           # [d] Start of the simulation
@@ -31,66 +31,32 @@ hF = 20                 # [cm] Height of the bottle including neck
 D = 1                   # [cm2 d-1] Diffusion coefficient
 Dx = np.sqrt(2*DT*D)    # [cm] Standard deviation of the single step 
                         #      in the random walk
-n = int(100)            # [# particles] Number of particles
-# [# particles] Number of particles in the bottle without neck
-nF = int(n*dB*hB/(dB*hB+(xmax-xmin)*(hF-hB)))   
+n = int(10**4)          # [# particles] Number of particles
 
-# Parameters: Initial condition
-x = np.zeros((len(time), n))
-y = np.zeros((len(time), n))
-in_bottle = np.zeros((len(time), n))
+# Parameters: Simulation
+seed = None             # [-] Seed of the random numbers, e.g. 42, for 
+                        #     reproducible results
+workers = 1             # [-] Number of parallel processes
+checkpoint = None       # [-] File for the progress, e.g. 'Example.04.11.npz', a 
+                        #     rerun resumes an interrupted simulation
+shard_size = 2500       # [-] Number of particles per shard and checkpoint, 
+                        #     independent of workers for reproducible results
 
-# Starting position of the particles
+store = None
+if checkpoint is not None:
+    store = st.RunStore(checkpoint, dict(n=n, nt=len(time), Dx=Dx, dB=dB, hB=hB, 
+                                         hF=hF, xmin=xmin, xmax=xmax, seed=seed, 
+                                         shard_size=shard_size))
 
-# Particles in the bottle without neck
-x[0][0:nF] = np.random.random(nF)*dB     
-# Particles in the bottle neck                   
-x[0][nF:n] = xmin + np.random.random((n-nF))*(xmax-xmin)
-# Height of the particles in the bottle    
-y[0][0:nF] = np.random.random(nF)*hB    
-# Height of the particles in the bottle neck                    
-y[0][nF:n] = hB + np.random.random((n-nF))*(hF-hB)          
+# Random walk of all particles, counts the particles which are still in the 
+# bottle in each time step
+n_in, x, y = st.run_sharded(st.bottle_walk, n, seed=seed, workers=workers, 
+                            shard_size=shard_size, store=store, 
+                            merge=('sum', 'concat', 'concat'), nt=len(time), 
+                            Dx=Dx, dB=dB, hB=hB, hF=hF, xmin=xmin, xmax=xmax)
 
-for i in tq.tqdm(range(1, len(time))):
-    for j in range(0, n):
-        # New x coordinate after random step
-        Delx = x[i-1][j] + Dx*np.random.normal(0, 1) 
-        # New y coordinate after random step        
-        Dely = y[i-1][j] + Dx*np.random.normal(0, 1)         
-        # The next steps test that the particles do not move outside of the 
-        # bottle (boundary condition)
-        if Dely < hB:
-            if Delx > 0 and Delx < dB:
-                x[i][j] = Delx
-            else:
-                x[i][j] = x[i-1][j]
-        else:
-            if Delx > xmin and Delx < xmax:
-                x[i][j] = Delx
-            else:
-                x[i][j] = x[i-1][j]
-        
-        if y[i-1][j] > hF:
-            y[i][j] = y[i-1][j]
-        else:
-            if Dely < 0:
-                y[i][j] = y[i-1][j]
-            else: 
-                if Dely < hB:
-                    if Delx > 0 and Delx < dB:
-                        y[i][j] = Dely
-                    else:
-                        y[i][j] = y[i-1][j]
-                else:
-                    if Delx > xmin and Delx < xmax:
-                        y[i][j] = Dely
-                    else:
-                        y[i][j] = y[i-1][j]
-    # Marks all particles which are still in the bottle
-    in_bottle = np.where(y < hF, 1, 0)                      
-
-# Counts the particles which are still in the bottle
-in_bottle_sum = np.sum(in_bottle/n, axis=1)                 
+# Fraction of particles which are still in the bottle
+in_bottle_sum = n_in/n
 
 ###############################################################################
 # %% Plots
@@ -98,7 +64,8 @@ in_bottle_sum = np.sum(in_bottle/n, axis=1)
 # %% Plot Example 4.11
 fig = plt.figure('Example 4.11')
 plt.title('Example 4.11')   
-plt.scatter(x, y, s=0.1, color='black', label='In')
+plt.scatter(np.where(y < hF, x, np.nan), np.where(y < hF, y, np.nan), s=0.1, 
+            color='black', label='In')
 plt.scatter(np.where(y > hF, x, np.nan), np.where(y > hF, y, np.nan), s=0.1, 
             color='red', label='Out')
 plt.xlabel('x [mm]')
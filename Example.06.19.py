@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 6.19: Numerical modeling of closed turbulent PFR
@@ -17,6 +17,11 @@ DT = 0.0002     # [d] Time step
 # Time span
 time = np.arange(STARTTIME, STOPTIME, DT)
 
+# Output times, the integration steps follow the dynamics and not DT, as the
+# inlet concentration is smooth
+time_out = np.linspace(STARTTIME, time[-1], 601)
+max_step = 0.01 # [d] Maximum integration step
+
 # Parameters: Process
 n = 25          # [-]       Number of partial reactors 
 Vtot = 500      # [m3]      Total volume of the reactor
@@ -34,13 +39,12 @@ initC = np.zeros(n)
 initC[0:n] = 1  # [g m-3] Initial values for the concentrations
 
 # Define ODE 
-def model(var, t, param):
+def model(var, t, param, dCdt):
     C = var
     k, Q, V, R, Cm, A, f, n = param
     C_in = Cm+A*np.sin(2*np.pi*t/f)     # [g m-3] Example of a time-dependent 
                                         #         inlet concentration
     
-    dCdt = list(range(n))
     # Balance for first reactor (closed for turbulence)
     dCdt[0] = (Q*C_in+R*C[1]-(Q+R)*C[0])/V-k*C[0] 
     
@@ -49,11 +53,10 @@ def model(var, t, param):
     
     # Balance for the last reactor (closed)
     dCdt[n-1] = ((Q+R)*(C[n-2]-C[n-1]))/V-k*C[n-1]
-    
-    return dCdt
 
-# Solve ODE
-C = sh.sol_ode(model, var0=initC, t=time, param=[k, Q, V, R, Cm, A, f, n])
+# Solve ODE, the Jacobian of the cascade is tridiagonal
+C = st.sol_ode(model, var0=initC, t=time, param=[k, Q, V, R, Cm, A, f, n], 
+               band=(1, 1), t_eval=time_out, max_step=max_step)
 
 ###############################################################################
 # %% Plots
@@ -72,7 +75,7 @@ plt.show()
 # %% Plot Example 6.19
 fig = plt.figure('Example 6.19')
 plt.title('Example 6.19')
-plt.plot(time,C[:,-1], color='black', label='C$_n$(t)')
+plt.plot(time_out,C[:,-1], color='black', label='C$_n$(t)')
 plt.xlabel('Time t [d]')
 plt.ylabel('C$_n$ [g m$^{-3}$]')
 plt.grid()
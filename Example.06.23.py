@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 6.23: Implementation of an SBR
@@ -48,8 +48,18 @@ def model(var, t, param):
     dCdt = Q_in*(C_in-C)/V+r           # Balance for the material
     return dVdt, dCdt
 
-# Solve ODE
-V, C = sh.sol_ode(model, var0=[initV, initC], t=time, param=[C_in, k])
+# The reactor is drained when V falls to Vmin
+def drained(var, t, param):
+    V, C = var
+    return V-Vmin
+drained.direction = -1
+
+# Solve ODE, the integration restarts at the start of the filling, its end
+# and the start of the draw of every cycle, and when the reactor is drained.
+# The steps are therefore not limited by the switches.
+tswitch = np.add.outer(np.arange(STARTTIME, STOPTIME), [0, 0.2, 0.6]).ravel()
+V, C = st.sol_ode(model, var0=[initV, initC], t=time, param=[C_in, k],
+                  tswitch=tswitch, events=drained, max_step=np.inf)
 
 ###############################################################################
 # %% Plots
@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 import scipy as sp
 
 ###############################################################################
@@ -35,19 +35,18 @@ for i in range(0, len(n)):
         initF[1:n[i]] = 0          # Initial condition for remaining reactors
     
     # Define ODE
-    def model(var, t, param):
+    def model(var, t, param, dFdt):
         F = var
         HRT, n = param
         
         # Balance equations
-        dFdt = list(range(n))
         dFdt[0] = -F[0]*n/HRT
         if n > 1:
             dFdt[1:n] = (F[0:n-1]-F[1:n])*n/HRT  
-        return dFdt
     
-    # Solve ODE
-    F[f'result{i+1}'] = sh.sol_ode(model, var0=initF, t=tau, param=[HRT, n[i]])
+    # Solve ODE, the cascade is linear and solved exactly
+    F[f'result{i+1}'] = st.sol_ode(model, var0=initF, t=tau, param=[HRT, n[i]], 
+                                   linear=True)
     
     # Cumulative RTD
     F_tau[f'result{i+1}'] = np.zeros(n[i])
@@ -105,19 +104,18 @@ for i in range(0, 6):
     initF[1:(i+1)] = 0              # Initial condition for remaining reactors
     
     # Define ODE
-    def model(var, t, param):
+    def model(var, t, param, dFdt):
         F = var
         HRT, n = param
         
         # Balance equations
-        dFdt = list(range(n))
         dFdt[0] = -F[0]*n/HRT
         if n > 1:
             dFdt[1:n] = (F[0:n-1]-F[1:n])*n/HRT  
-        return dFdt
     
-    # Solve ODE
-    F[f'result{i+1}'] = sh.sol_ode(model, var0=initF, t=tau, param=[HRT, (i+1)])
+    # Solve ODE, the cascade is linear and solved exactly
+    F[f'result{i+1}'] = st.sol_ode(model, var0=initF, t=tau, param=[HRT, (i+1)], 
+                                   linear=True)
     
     # Cumulative RTD
     F_tau[f'result{i+1}'] = np.zeros((i+1))
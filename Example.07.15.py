@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 import scipy as sp
 
 ###############################################################################
@@ -32,22 +32,20 @@ initC[0] = 1*Q/V    # [h-1] Initial condition for the first element
 initC[1:n] = 0      # [h-1] Initial condition for elements 2 to n
 
 # Define ODE
-def model(var, t, param):
+def model(var, t, param, dCdt):
     C = var
     Q, R, V, C_in = param
     
-    dCdt = list(range(n))
     # Balance for the first element, boundary condition
     dCdt[0] = (Q*C_in + R*C[1] - (Q+R)*C[0])/V                      
     # Balance for elements 2 to n-1
     dCdt[1:n-1] = ((Q+R)*(C[0:n-2] - C[1:n-1]) + R * (C[2:n] - C[1:n-1]))/V   
     # Balance for the last element, boundary condition
     dCdt[n-1] = (Q+R)*(C[n-2] - C[n-1])/V                           
-    return dCdt
 
-# Solve ODE
+# Solve ODE, the cascade is linear and solved exactly
 # [h-1] effluent concentration 
-C = sh.sol_ode(model, var0=initC, t=tau, param=[Q, R, V, C_in])        
+C = st.sol_ode(model, var0=initC, t=tau, param=[Q, R, V, C_in], linear=True)
 
 ###############################################################################
 # %% Plots
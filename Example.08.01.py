@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 8.1: Effect of time of mixing on reactor performance
@@ -43,17 +43,15 @@ for i in range(len(orders)):
         V[iCSTR] = Vtot/2
     
         # Define ODE
-        def model(var, t, param):
+        def model(var, t, param, dCdt):
             C = var
             Q, Vtot, C_in, m, k, iCSTR = param
             
-            dCdt = list(range(n))   
             dCdt[0] = Q*(C_in - C[0])/V[0] - k*C[0]**m
             dCdt[1:n] = Q*(C[0:n-1] - C[1:n])/V[1:n] - k*C[1:n]**m
-            return dCdt
     
         # Solve ODE
-        C[ii] = sh.sol_ode(model, var0=initC, t=time, 
+        C[ii] = st.sol_ode(model, var0=initC, t=time, 
                            param=[Q, Vtot, C_in, m, k, iCSTR])
 
     eff[i][0:n] = [C[a][-1][-1] for a in range(n)]
@@ -48,7 +48,7 @@ def model(var, t, param):
     V = Vtot/n
     n = int(n)
     C_in = CBG
-    dCdt = list(range(n)) 
+    dCdt = np.zeros(n)
     dCdt[0] = (C_in*Q-C[0]*(Q+R)+C[1]*R)/V  # Balance for 1. partial reactor
     dCdt[1] = ((Q+R)*(C[0]-C[1]))/V         # Balance for 2. partial reactor
     dCdt[2] = (Q*C[1]-(Q+R)*C[2]+R*C[3])/V  # Balance for 3. partial reactor
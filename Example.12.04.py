@@ -5,6 +5,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 12.4: Implementation of Eq. 12.11
@@ -41,7 +42,9 @@ def model(var, t, param):
                   
     return dSdt
 
-S = sh.sol_ode(model, var0=[initS], t=time, param=[kla, S_sat, rO2, tair])
+# The integration restarts when the aeration is switched off
+S = st.sol_ode(model, var0=[initS], t=time, param=[kla, S_sat, rO2, tair],
+               tswitch=[tair])
 
 ###############################################################################
 # %% Plots
@@ -49,7 +52,7 @@ S = sh.sol_ode(model, var0=[initS], t=time, param=[kla, S_sat, rO2, tair])
 # %% Plot Example 12.4, Fig 12.5
 fig = plt.figure('Example 12.4, Fig 12.5')
 plt.title('Example 12.4, Fig 12.5')
-plt.plot(time, np.transpose(S), 'o', color='black', linestyle='-', label='S')
+plt.plot(time, S, 'o', color='black', linestyle='-', label='S')
 plt.text(1, 13, 'Model A')
 plt.xlabel('Time [min]')
 plt.ylabel('Oxygen concentration S [gO2 m$^{-3}$]')
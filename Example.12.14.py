@@ -4,7 +4,7 @@
 # Load packages and functions
 import numpy as np
 import matplotlib.pyplot as plt
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 12.14: Computation of the error propagation after Eq. 12.37
@@ -44,11 +44,11 @@ def var0(param_var0):
     initS = S0  # [gO2 m-3] Balance for oxygen concentration
     return initS       
 
-# Define ODE
+# Define ODE, vectorized: the parameters may have one value per run
 def model(var, t, param):
     S = var
     kla, S_sat, rO2, tair, KO2 = param
-    S = sh.limit(S, 0) # Negative oxygen concentrations are not possible
+    S = np.maximum(S, 0) # Negative oxygen concentrations are not possible
     
     if t <= tair: # Switch off the aeration after 15 min
         on = 1
@@ -58,52 +58,29 @@ def model(var, t, param):
                   
     return dSdt
 
-# Absolute-relative sensitivity
-sens_ar = np.zeros((len(time), k))
-sens_ar[:, 0] = sh.sensitivity(S_sat, 'time' ,model, var0, t=time,
-                              param=[kla, S_sat, rO2, tair, KO2], param_var0=[S0])   
-sens_ar[:, 1] = sh.sensitivity(rO2, 'time', model, var0, t=time,
-                              param=[kla, S_sat, rO2, tair, KO2], param_var0=[S0])   
-sens_ar[:, 2] = sh.sensitivity(kla, 'time', model, var0, t=time
-                              ,param=[kla, S_sat, rO2, tair, KO2], param_var0=[S0])   
-sens_ar[:, 3] = sh.sensitivity(S0, 'time', model, var0, t=time,
-                              param=[kla, S_sat, rO2, tair, KO2], param_var0=[S0])   
-sens_ar[:, 4] = sh.sensitivity(KO2, 'time', model, var0, t=time,
-                              param=[kla, S_sat, rO2, tair, KO2], param_var0=[S0])   
+# Absolute-relative sensitivity to S_sat, rO2, kla, S0 and KO2, all runs 
+# are solved together. S is the solution with the estimated parameters. The
+# integration restarts when the aeration is switched off
+sens_ar, S = st.sensitivity_matrix(model, var0, t=time, 
+                                   param=[kla, S_sat, rO2, tair, KO2], 
+                                   pars=[('param', 1), ('param', 2), ('param', 0), 
+                                         ('param_var0', 0), ('param', 4)], 
+                                   param_var0=[S0], tswitch=[tair])
     
 # Relative-relative sensitivity
-sens_rr = np.zeros((len(time), k))
-for i in range(0, k):
-    sens_rr[:, i] = sens_ar[:, i]/mean[i]
+sens_rr = sens_ar/mean
 
-# Standard error of S, without covariance = Gaussian error propagation
-A = np.zeros([len(time), k])
-for i in range(0, k):
-    A[:, i] = std[i]**2*sens_rr[:, i]**2
-sigma_wo = np.sqrt(np.sum(A, axis=1))
-
-# Standard error of S, with covariance
-B = np.zeros([len(time), k])
-sum1 = np.zeros([len(time), k])
-C = np.zeros([len(time), k])
-for i in range(0, k):
-    for j in range(0, k):
-        B[:, j] = sens_rr[:, j]*cov[i, j]
-        sum1[:, i] = np.sum(B, axis=1)
-    C[:, i] = sens_rr[:, i]*sum1[:, i]
-sigma_w = np.sqrt(np.sum(C, axis=1))
-
-# Solve ODE
-initS = S0
-S = np.array(sh.sol_ode(model, var0=[initS], t=time,
-                        param=[kla, S_sat, rO2, tair, KO2]))
-S = S.reshape(len(time))
+# Standard error of S, with covariance and without covariance = Gaussian 
+# error propagation
+sigma_w, sigma_wo, contrib = st.error_propagation(sens_rr, cov, std)
 
 ###############################################################################
 # %% Plots
 ###############################################################################
 # %% Plot Example 12.14, Fig 12.14
+fig = plt.figure('Example 12.14, Fig. 12.14')
 plt.title('Example 12.14, Fig. 12.14')
+plt.plot(time, sens_ar)
 plt.text(0.75, 6.8, 'Model E')
 plt.xlabel('Time [min]')
 plt.ylabel('Absolute relative sensitivity of S [g$_{O2}$ m$^{-3}$]')
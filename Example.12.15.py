@@ -4,46 +4,34 @@
 # Load packages and functions
 import numpy as np
 import matplotlib.pyplot as plt
+import sammtools as st
 
 ###############################################################################
 # %% Example 12.15: Computation of π with stochastic simulation
 ###############################################################################
-# Please note that this simulation takes a long time.
-# To make it faster, reduce the STOPTIME to 5*10**5 
+# The points are drawn in blocks, 10^8 trials take a few seconds
  
 # Parameters: Time
 STARTTIME = 1       # Start
-STOPTIME = 5*10**5  # Trials
+STOPTIME = 10**8    # Trials
 DT = 1              # Counter
 
-# Time span
-time = np.arange(STARTTIME, STOPTIME, DT)
-
 # Parameters: Process
 n = int((STOPTIME-STARTTIME)/DT)
+seed = None         # [-] Seed of the random numbers, e.g. 42, for 
+                    #     reproducible results
 
-# Parameters: Initial condition
-success = list(range(n))    # Counter of successes
-NPI = list(range(n))        # Estimate of π
+# Model: 4 times the success of a random point in the unit square, whose 
+# radius^2 is not larger than 1
+def hits(size, rng):
+    x, y = rng.random((2, size))
+    return 4*(x**2 + y**2 <= 1)
 
-# Model
-for i in range(n):
-    # Radius^2 of a random point
-    r2 = np.random.uniform(0, 1)**2 + np.random.uniform(0, 1)**2    
-    if i == 0:
-        if r2 <= 1:
-            success[i] = 1
-        else: 
-            success[i] = 0
-    else: 
-        if r2 <= 1:
-            success[i] = success[i-1] + 1
-        else: 
-            success[i] = success[i-1]
-        
-    NPI[i] = 4*success[i]/time[i]
+# Running estimate of π and its standard error, at 1000 counters
+time, NPI, NPI_se = st.running_estimate(hits, n, rng=np.random.default_rng(seed))
     
 PI = NPI[-1]
+print('π =', PI, '+-', NPI_se[-1])
 
 ###############################################################################
 # %% Plots
@@ -52,6 +40,8 @@ PI = NPI[-1]
 fig = plt.figure('Example 12.15')
 plt.title('Example 12.15')
 plt.plot(time, NPI, color='black', label='π')
+plt.fill_between(time, NPI-NPI_se, NPI+NPI_se, color='grey', alpha=0.5, 
+                 label='Standard error')
 plt.xlabel('Counter [-]')
 plt.ylabel('π [-]')       
 plt.grid()
@@ -5,6 +5,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 12.18: MC simulation with two correlated parameters, Option 1
@@ -43,14 +44,18 @@ def model(var, t, param):
     dCdt = -k*C # Model equation
     return dCdt
     
+# Covariance matrix of C0 and k, k with the residuals of Eq. 12.41
+cov = np.array([[C0_sig**2, corr*k_sig*C0_sig],
+                [corr*k_sig*C0_sig, (corr*k_sig)**2 + Res_sig**2]])
+
 # Monte Carlo
+# [g m-3] Stochastic variation of C0 and [h-1] of k
+C0_MC, k_MC = st.mvsample(runs, [C0_mu, k_mu], cov)
 C_MC = np.zeros([len(time), runs])
 for i in range(0, runs):
-    # [g m-3] Stochastic variation of C0 
-    C0 = np.random.normal(C0_mu, C0_sig)                                 
+    C0 = C0_MC[i]
     # C = sh.limit(C0, 0)
-    # [h-1] Stochastic variation of k
-    k = k_mu+corr*k_sig/C0_sig*(C0-C0_mu)+np.random.normal(0, Res_sig)    
+    k = k_MC[i]
     # k = sh.limit(k, 0)
     C_MC[:, i] = sh.sol_ode(model, var0=C0, t=time, param=[k]).flatten()     
 
@@ -106,8 +111,10 @@ runs = 1000
 Res_sig = (n/(n-2)*(1-corr**2)*k_sig**2)**0.5 
 
 # Parameters: Variation
-C0_MC = np.random.normal(C0_mu, C0_sig, runs) 
-k_MC = k_mu + corr*k_sig/C0_sig*(C0_MC-C0_mu)+np.random.normal(0, Res_sig, runs)
+# Covariance matrix of C0 and k, k with the residuals of Eq. 12.41
+cov = np.array([[C0_sig**2, corr*k_sig*C0_sig],
+                [corr*k_sig*C0_sig, (corr*k_sig)**2 + Res_sig**2]])
+C0_MC, k_MC = st.mvsample(runs, [C0_mu, k_mu], cov)
 
 # Parameters: Initial condition
 def var0(param_var0):
@@ -126,9 +133,10 @@ def model(var, t, param):
 # Solve ODE
 C = sh.sol_ode(model, var0(C0_mu), t=time, param=[k_mu])
 
-# Monte Carlo
-results, mean, stddev = sh.MonteCarlo(model, var0, t=time, param=[k_MC], 
-                                      param_var0=[C0_MC], x_ind=0)
+# Monte Carlo, all runs are solved together
+results, mean, stddev = st.MonteCarlo(model, var0, t=time, param=[k_MC], 
+                                      param_var0=[C0_MC], x_ind=0, 
+                                      ensemble=True)
 
 ###############################################################################
 # %% Plots
@@ -4,7 +4,7 @@
 # Load packages and functions
 import numpy as np
 import matplotlib.pyplot as plt
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 12.22: MC simulation of the case study
@@ -16,35 +16,33 @@ DT = 0.001       # [h] ime step of the model evaluation
 
 # Time span
 time = np.arange(STARTTIME, STOPTIME, DT)
+every = 100      # [-] Output at every 100th time point
+max_step = 0.1   # [h] Maximum integration step, the steps follow the dynamics 
+                 #     and not DT
 
 # Parameters: Process
 runs = 100
+method = 'lhs'  # [-] Sampling: 'random', 'lhs' (Latin hypercube), 'sobol' or 'halton'
+workers = 1     # [-] Number of parallel processes for the Monte Carlo runs
 
 # Parameters: Variation
-# Stochastic Ssat
 Ssat_mu = 9.85
 Ssat_sig = 0.29
-Ssat_MC = np.random.normal(Ssat_mu, Ssat_sig, runs)
-Ssat_MC = sh.limit(Ssat_MC, 0) 
-# Stochastic rO2max
 rO2max_mu = -0.438
 rO2max_sig = 0.016
-rO2max_MC = np.random.normal(rO2max_mu, rO2max_sig, runs)
-# Stochastic kla
 kla_mu = 0.152
 kla_sig = 0.0093
-kla_MC = np.random.normal(kla_mu, kla_sig, runs) 
-kla_MC = sh.limit(kla_MC, 0) 
-# Stochastic S0
 S0_mu = 2.03
 S0_sig = 0.078
-S0_MC = np.random.normal(S0_mu, S0_sig, runs)
-S0_MC = sh.limit(S0_MC, 0)
-# Stochastic KO
 KO_mu = 0.996
 KO_sig = 0.144
-KO_MC = np.random.normal(KO_mu, KO_sig, runs)
-KO_MC = sh.limit(KO_MC, 0)
+# Stochastic parameters, normally distributed and limited to positive values
+Ssat_MC, rO2max_MC, kla_MC, S0_MC, KO_MC = st.sample(runs, [
+    ('truncnorm', Ssat_mu, Ssat_sig, 0, np.inf),
+    ('normal', rO2max_mu, rO2max_sig),
+    ('truncnorm', kla_mu, kla_sig, 0, np.inf),
+    ('truncnorm', S0_mu, S0_sig, 0, np.inf),
+    ('truncnorm', KO_mu, KO_sig, 0, np.inf)], method=method)
 
 # Parameters: Initial condition
 def var0(param_var0):
@@ -65,14 +63,17 @@ def model(var, t, param):
         dSdt = rO2
     return dSdt
 
-# Solve ODE
-S = sh.sol_ode(model, var0([S0_mu]), t=time,
-               param=[kla_mu, Ssat_mu, rO2max_mu, KO_mu])
+# Solve ODE, the integration restarts when the aeration is switched off
+S = st.sol_ode(model, var0([S0_mu]), t=time,
+               param=[kla_mu, Ssat_mu, rO2max_mu, KO_mu], tswitch=[15], every=every, 
+               max_step=max_step)
 
 # Monte Carlo
-results, mean, stddev = sh.MonteCarlo(model, var0, t=time,
-                                      param=[kla_MC, Ssat_MC, rO2max_MC, KO_MC],
-                                      param_var0=[S0_MC])
+# Only mean and standard deviation are needed, the runs are not kept
+_, mean, stddev = st.MonteCarlo(model, var0, t=time,
+                                param=[kla_MC, Ssat_MC, rO2max_MC, KO_MC],
+                                param_var0=[S0_MC], workers=workers, stream=True,
+                                tswitch=[15], every=every, max_step=max_step)
 
 # The second part with correlated parameters is missing, as P is unknown
 
@@ -82,9 +83,9 @@ results, mean, stddev = sh.MonteCarlo(model, var0, t=time,
 # %% Plot Example 12.22
 plt.figure('Example 12.22')
 plt.title('Example 12.22')
-plt.plot(time, mean, 'black', linewidth=2)
-plt.plot(time, mean+stddev, 'b--', linewidth=1)
-plt.plot(time, mean-stddev, 'b--', linewidth=1)
+plt.plot(time[::every], mean, 'black', linewidth=2)
+plt.plot(time[::every], mean+stddev, 'b--', linewidth=1)
+plt.plot(time[::every], mean-stddev, 'b--', linewidth=1)
 plt.legend(['mean', 'standard deviation'], loc='upper right', 
            bbox_to_anchor=(1, 0.9))
 plt.xlabel('Time [h]')
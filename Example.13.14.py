@@ -5,6 +5,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 13.14: Modeling of a delay
@@ -33,18 +34,17 @@ for i in range(1, len(time)):       # Temporal change of Vin
 initV = np.zeros(n)
 
 # Model
-def model(var, t, param):
+def model(var, t, param, dVdt):
     V = var
     TH = param
     V_in = np.interp(t, time, Vin)
-    dVdt = list(range(n))
     # Delay of the signal in nth order
     dVdt[0] = (V_in - V[0])/TH
     dVdt[1:n] = ((V[0:n-1] - V[1:n]))/TH
-    return dVdt
 
-# Solve ODE
-V = sh.sol_ode(model, var0=initV, t=time, param=TH)
+# Solve ODE, the delay chain is linear and solved exactly, V_in is linear
+# between the time points
+V = st.sol_ode(model, var0=initV, t=time, param=TH, linear=True)
 
 # Addition of the dead time, retarded signal
 Vout = sh.delay(time, V, Tt)
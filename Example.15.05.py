@@ -5,7 +5,7 @@
 import math
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Example 15.5: Response of a fish population to a toxic spill
@@ -21,44 +21,22 @@ tau = np.arange(STARTTIME, STOPTIME, DT)
 # Parameters: Process
 nfish = 1000        # [-] Number of individual fish 
 nruns = 1000        # [-] Number of runs 
-C = np.zeros((len(tau), nruns))   
-E = np.zeros((len(tau), nruns))     
-Damage = np.zeros((nfish, nruns)) 
-FractionDamaged = np.zeros(nruns) 
 
 # Random choice of tolerable exposures, describes variability of fish
-Et = np.zeros(nfish)
-Et[0:nfish] = np.random.normal(750, 50, nfish) 
+Et = np.random.normal(750, 50, nfish) 
 
-for i in range(0, nruns):
-    # Parameters: initial condition
-    initC = np.random.uniform(5, 15) 
-    # Initial exposure
-    initE = 0 
-    # [min-1] Random choice of recession constant for pollutant concentration
-    k = np.random.normal(0.02, 0.002)
-    
-    # Define ODE
-    def model(var, t, param):
-        C, E = var
-        # Time course of pollutant concentration
-        dCdt = -k*C
-        # Exposure is equal for all fish
-        dEdt = C
-        return dCdt, dEdt
+# Parameters: Variation
+# [g m-3] Random choice of initial pollutant concentration
+initC = np.random.uniform(5, 15, nruns) 
+# [min-1] Random choice of recession constant for pollutant concentration
+k = np.random.normal(0.02, 0.002, nruns)
 
-    # Solve ODE
-    C[:,i], E[:,i] = sh.sol_ode(model, var0=[initC, initE], t=tau, param=[])
-    
-    # Check whether damage occurs
-    for j in range(0, nfish):
-        if Et[j] > E[-1,i]:
-            Damage[j,i] = 0
-        else: 
-            Damage[j,i] = 1
-            
-# Fraction of damaged fish             
-FractionDamaged = np.mean(Damage, axis=0)
+# Exposure at the end of the simulation, the integral of C = initC*exp(-k*t), 
+# is equal for all fish
+E = st.exposure(initC, k, tau[-1])
+
+# Fraction of damaged fish, whose tolerable exposure does not exceed E
+FractionDamaged = st.damage_fraction(E, Et)
 
 # [%] Cumulative distribution of damaged fish
 sorted_FractionDamaged = np.sort(FractionDamaged)*100
@@ -4,6 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
+import sammtools as st
 
 ###############################################################################
 # %% Example 15.13: Uncertain definition of distributions may lead to 
@@ -11,17 +12,30 @@ import numpy as np
 ###############################################################################
 # Parameters: Process
 n = 10**7
-k = np.zeros(n)
-h = np.zeros(n)
+# Range of the lower uncertain limit of kO3, 52 = expected value
+lo = (52*0.5, 52*1.0)
+# Range of the upper uncertain limit of kO3
+hi = (52*1.0, 52*1.5)
+# Bins of the histogram, kO3 lies between 52*0.5 and 52*1.5
+edges = np.linspace(26, 78, 53)
 
-for i in range(0, n):
-    # Parameters: Process
-    # Lower uncertain limit of fV,kO3
-    lo = np.random.uniform(0.5, 1.0)
-    # Upper uncertain limit of fV,kO3
-    hi = np.random.uniform(1.0, 1.5)
-    # Generation of stochastic values of kO3, 52 = expected value 
-    k[i] = 52*np.random.uniform(lo,hi)
+# Parameters: Simulation
+seed = None             # [-] Seed of the random numbers, e.g. 42, for 
+                        #     reproducible results
+workers = 1             # [-] Number of parallel processes
+checkpoint = None       # [-] File for the progress, e.g. 'Example.15.13.npz', a 
+                        #     rerun resumes an interrupted simulation
+
+store = None
+if checkpoint is not None:
+    store = st.RunStore(checkpoint, dict(n=n, lo=lo, hi=hi, edges=edges, seed=seed))
+
+# Generation of stochastic values of kO3 between the random limits, counted 
+# in the bins without storing the values
+counts = st.run_sharded(st.sample_histogram, n, seed=seed, workers=workers, 
+                        shard_size=10**6, store=store, sampler=st.compound_uniform, 
+                        args=(lo, hi), edges=edges)
+density = counts/(n*np.diff(edges))
 
 ###############################################################################
 # %% Plots
@@ -29,8 +43,8 @@ for i in range(0, n):
 # %% Plot Example 15.13
 plt.figure("Example 15.13, Fig. 15.8")
 plt.title("Example 15.13, Fig. 15.8")
-plt.hist(k, bins=52, edgecolor='black', density=True, 
-         label='Histogram based on uncertain limits (10$^7$ simulations)')
+plt.hist(edges[:-1], bins=edges, weights=density, edgecolor='black', 
+         label=f'Histogram based on uncertain limits ({n:,} simulations)')
 plt.plot([26,52,78],[0,1/52*2,0],color='black',linestyle='--',
          label='Equivalent triangular distribution')
 plt.xlabel("Value of randomized k$_{O3}$ [d$^{-1}$]")
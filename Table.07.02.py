@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Table 7.2: Implementation of a stochastic model of a cascade of stirred 
@@ -26,34 +26,28 @@ Q = 2                   # [m3/T] Flow rate
 p = DT*Q/V              # [-] Probability that a particle leaves the reactor 
                         # compartment in the time step DT; 
                         # must be smaller than 0.01
-nP = 10000              # Number of particles
+nP = 100000             # Number of particles
 
-# Parameters: Initial condition
-loc = np.zeros((len(time),nP))   
-                                 
-loc[0,:] = 1
-        
-effluent = np.zeros((len(time),nP)) 
-InEffluent = np.zeros((len(time)))
+# Parameters: Simulation
+seed = None             # [-] Seed of the random numbers, e.g. 42, for 
+                        #     reproducible results
+workers = 1             # [-] Number of parallel processes
+checkpoint = None       # [-] File for the progress, e.g. 'Table.07.02.npz', a 
+                        #     rerun resumes an interrupted simulation
 
-# Location of particles at time t (reactor comp.)                         
-for i in range(1, len(time)):
-    for ii in range(0, nP):
-        rand = np.random.uniform(0, 1)
-        if rand < p:
-            loc[i, ii] = loc[i-1, ii] + 1
-        else:
-            loc[i, ii] = loc[i-1, ii]
-        # Marking of the particles in the effluent
-        if loc[i, ii] > nR:
-            effluent[i, ii] = 1
-        else:
-            effluent[i, ii] = 0
-    # Counting the particles already in the effluent 
-    InEffluent[i] = np.sum(effluent[i, :]) / nP
+store = None
+if checkpoint is not None:
+    store = st.RunStore(checkpoint, dict(nP=nP, nR=nR, p=p, nt=len(time), seed=seed))
 
-# Numeric derivative, requires nP > 100,000
-f = (InEffluent - sh.delay(time, InEffluent, DT)) / DT
+# Time step in which each particle reaches the effluent, sum of the geometric 
+# holding times in the nR reactor compartments, counted per time step
+counts = st.run_sharded(st.exit_step_histogram, nP, seed=seed, workers=workers, 
+                        store=store, sampler=st.cascade_exit_steps, args=(nR, p), 
+                        nt=len(time))
+
+# Fraction of the particles already in the effluent and its numeric 
+# derivative, both from the histogram of the exit steps
+InEffluent, f = st.rtd_from_histogram(counts, nP, DT)
 
 ###############################################################################
 # %% Plots
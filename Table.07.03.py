@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Table 7.3: Implementation of a stochastic model of a turbulent plug-flow 
@@ -25,40 +25,29 @@ Q = 20                  # [m3d-1] Flow rate
 u = Q/A                 # [md-1] Flow velocity, advection
 D = 5                   # [m2d-1] Dispersion coefficient
 sig = (2*D*DT)**0.5     # [m] Standard deviation of the random step, Eq. (4.9)
-nP = 10000              # [-] Number of particles
+nP = 100000             # [-] Number of particles
 
-# Parameters: Initial condition
-# [m] Initial location of particles without boundary conditions  
-xnew = np.zeros((len(time), nP))
-# [m] Initial location of particles with boundary conditions
-x = np.zeros((len(time), nP))  
-# For particles in the effluent
-Effluent = np.zeros((len(time), nP))  
-InEffluent = np.zeros(len(time))  
-f = np.zeros(len(time))  
+# Parameters: Simulation
+seed = None             # [-] Seed of the random numbers, e.g. 42, for 
+                        #     reproducible results
+workers = 1             # [-] Number of parallel processes
+checkpoint = None       # [-] File for the progress, e.g. 'Table.07.03.npz', a 
+                        #     rerun resumes an interrupted simulation
 
-for i in range(1, len(time)):
-    for ii in range(0, nP):
-        # [m] New location of particles without boundary conditions
-        xnew[i, ii] = x[i-1, ii] + np.random.normal(u*DT, sig)
-        # Examination of the boundary conditions
-        if xnew[i, ii] < 0:
-            x[i, ii] = x[i-1, ii]
-        elif xnew[i, ii] > L:
-            x[i, ii] = L
-        else:
-            if x[i-1, ii] == L:
-                x[i, ii] = L
-            else:
-                x[i, ii] = xnew[i, ii]
-        # Marking the particles in the effluent
-        if x[i, ii] == L:
-            Effluent[i, ii] = 1
-    # Counting the particles in the effluent
-    InEffluent[i] = np.sum(Effluent[i, :], axis = 0) / nP
+store = None
+if checkpoint is not None:
+    store = st.RunStore(checkpoint, dict(nP=nP, nt=len(time), L=L, u=u, sig=sig, 
+                                         DT=DT, seed=seed))
 
-# Numeric derivative
-f = (InEffluent - sh.delay(time, InEffluent, DT)) / DT
+# Time step in which each particle reaches the effluent, counted per time 
+# step. Only the positions of the particles still in the reactor are kept
+counts = st.run_sharded(st.exit_step_histogram, nP, seed=seed, workers=workers, 
+                        store=store, sampler=st.pfr_exit_steps, 
+                        args=(len(time), L, u, sig, DT), nt=len(time))
+
+# Fraction of the particles in the effluent and its numeric derivative, both 
+# from the histogram of the exit steps
+InEffluent, f = st.rtd_from_histogram(counts, nP, DT)
 
 ###############################################################################
 # %% Plots
@@ -5,6 +5,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Table 12.8: Execution of a Monte Carlo simulation for the computation of 
@@ -31,10 +32,11 @@ Res_sig = (n/(n-2)*(1-corr**2)*k_sig**2)**0.5
 time = np.arange(STARTTIME, STOPTIME, DT)
 
 # Parameters: Variation
-# [gm-3] Stochastic choice of C0 
-C0_MC = np.random.normal(C0_mu, C0_sig, runs)
-# [h-1] Stochastic choice of k, with correlation
-k_MC = k_mu + corr*k_sig/C0_sig*(C0_MC-C0_mu) + np.random.normal(0, Res_sig, runs)
+# Covariance matrix of C0 and k, k with the residuals of Eq. 12.41
+cov = np.array([[C0_sig**2, corr*k_sig*C0_sig],
+                [corr*k_sig*C0_sig, (corr*k_sig)**2 + Res_sig**2]])
+# [gm-3] Stochastic choice of C0 and [h-1] of k, with correlation
+C0_MC, k_MC = st.mvsample(runs, [C0_mu, k_mu], cov)
 
 # Parameters: Initial condition
 def var0(param_var0):
@@ -53,9 +55,10 @@ def model(var, t, param):
 # Solve ODE
 sol = sh.sol_ode(model, var0(C0_mu), t=time, param=[k_mu])
 
-# Monte Carlo
-results, mean, stddev = sh.MonteCarlo(model, var0, t=time, param=[k_MC], 
-                                      param_var0=[C0_MC], x_ind=0)
+# Monte Carlo, all runs are solved together
+results, mean, stddev = st.MonteCarlo(model, var0, t=time, param=[k_MC], 
+                                      param_var0=[C0_MC], x_ind=0, 
+                                      ensemble=True)
 
 ###############################################################################
 # %% Plots
@@ -4,7 +4,7 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 
 ###############################################################################
 # %% Table 15.4: Deterministic simulation of the ozonation and disinfection 
@@ -35,10 +35,10 @@ initCc = np.zeros(n)
 initCc[:] = 0.001      
 
 # Define ODE
-def model(var, t, param):
+def model(var, t, param, out):
     SO3, Cc = var
     Q, V, kO3, Ccin, kD = param
-    dSO3dt = list(range(n))
+    dSO3dt, dCcdt = out
     # Controlled concentration in reactor 1 
     dSO3dt[0] = 0
     # Ozone balance for reactors 2 and 3
@@ -47,16 +47,14 @@ def model(var, t, param):
     dSO3dt[3] = 0
     # Ozone balance for reactors 5 and 6
     dSO3dt[4:6] = Q*(SO3[3:5]-SO3[4:6])/V-kO3*SO3[4:6] 
-    dCcdt = list(range(n))
     # Balance for cysts in reactor 1
     dCcdt[0] = Q*(Ccin-Cc[0])/V-kD*Cc[0]*SO3[0]
     # Balance for cysts in reactors 2–6 
     dCcdt[1:6] = Q*(Cc[0:5]-Cc[1:6])/V-kD*Cc[1:6]*SO3[1:6]
-    return dSO3dt, dCcdt
 
 # Solve ODE
 # [h-1] effluent concentration 
-SO3, Cc = sh.sol_ode(model, var0=[initSO3, initCc], t=time, param=[Q, V, kO3, Ccin, kD])        
+SO3, Cc = st.sol_ode(model, var0=[initSO3, initCc], t=time, param=[Q, V, kO3, Ccin, kD])        
 
 # Effluent concentration of cysts 
 Cout = Cc[:, n-1]
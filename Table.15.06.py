@@ -4,14 +4,17 @@
 # Load packages and functions
 import matplotlib.pyplot as plt
 import numpy as np
-import sammhelper as sh
+import sammtools as st
 from scipy.optimize import root
 
 ###############################################################################
 #  %% Table 15.6: Stochastic simulation of the ozonation reactor
 ###############################################################################
-# Inner loop only: uncer_runs = 1 and var_runs = 1000
-# Both loops: uncer_runs = 1000 and var_runs = 1000 --> needs too much time
+# Inner loop only: uncer_runs = 1 and var_runs = 256
+# Both loops: uncer_runs = 100 and var_runs = 256 --> about 90 s
+# The variation is sampled with a scrambled Sobol sequence, 256 runs reach
+# the accuracy of the 95th percentile of 1000 pseudo-random runs. All runs 
+# of the volumes, uncertainty and variation are solved in large batches
 
 # Parameters: Time
 STARTTIME = 0           # [d] Beginning of the simulation
@@ -24,80 +27,82 @@ time = np.arange(STARTTIME, STOPTIME, DT)
 # Parameters: Process
 Vtots = [500, 600, 700, 800]    # [m3] Total reactor volume
 uncer_runs = 1                  # [-] Runs uncertainty (= outer loop) 
-var_runs = 1000                 # [-] Runs variation (= inner loop)
+var_runs = 256                  # [-] Runs variation (= inner loop), a power of 2
 n = 6                           # [-] Number of reactors
 Ccin = 1                        # [-] Relative influent concentration of cysts
 
-res = np.zeros((len(Vtots), uncer_runs))
-F = np.zeros((uncer_runs*var_runs))
+# Parameters: Simulation
+seed = None                     # [-] Seed of the random numbers, e.g. 42, for 
+                                #     reproducible results
+checkpoint = None               # [-] File for the progress, e.g. 'Table.15.06.npz', 
+                                #     a rerun with the same seed resumes an 
+                                #     interrupted simulation
+rng = np.random.default_rng(seed)
 
-for v in range(len(Vtots)):
+# Sample grid: volume x uncertainty x variation
+grid = (len(Vtots), uncer_runs, 1)
+Vtot = np.array(Vtots).reshape(-1, 1, 1)    # [m3] Total reactor volume
 
-    # Parameters: Process
-    Vtot = Vtots[v]                  # [m3] Total reactor volume
-    
-    for u in range(0, uncer_runs):
-        
-        # Uncertainty
-        fuQ = np.random.normal(1, 0.05)     # Normally distributed
-        fuV = np.random.uniform(0.8, 1)     # Randomly distributed 
-        fuSO31 = np.random.normal(1, 0.05)  # Measuring error, normally distributed
-        fuSO34 = np.random.normal(1, 0.05)  # SO4 is independent of SO1
-        fukO3 = 1                           # Uncertainty of kO3 is neglected
-        fukD = 1                            # Uncertainty of kD is neglected
-           
-        # Variation
-        fvSO31 = np.random.uniform(0.9, 1.1, var_runs)  # Evenly distributed
-        fvSO34 = np.random.uniform(0.9, 1.1, var_runs)  # Evenly distributed
-        fvkO3 = np.random.uniform(0.7, 1.3, var_runs)   # Randomly distributed
-        fvkD = np.random.uniform(0.8, 1.2, var_runs)    # Randomly distributed
-        
-        Q = fuQ * 10000          # [m3d-1] Influent
-        V = fuV * Vtot / n       # [m3] Active volume of a single reactor
-        kO3 = 52 * fukO3 * fvkO3 # [d-1] Reaction constant for ozone decay at 5°C
-        kD = 230 * fukD  * fvkD  # [m3g−1d−1] Reaction constant for disinfection at 5°C
-        SO31 = fvSO31            # Controlled, remain constant
-        SO34 = fvSO34            # Controlled, remain constant            
-        
-        # Parameters: Initial condition
-        def var0(param_var0):
-            SO31, SO34 = param_var0
-            initSO3 = np.zeros(n)
-            initCc = np.zeros(n)
-            initSO3[0] = SO31
-            initSO3[3] = SO34
-            initSO3[1:3] = 1
-            initSO3[4:6] = 1
-            initCc[:] = 0.001   
-            return initSO3, initCc
-        
-        # Define ODE
-        def model(var, t, param):
-            SO3, Cc = var
-            Q, V, kO3, Ccin, kD = param   
-            dSO3dt = list(range(n))
-            dSO3dt[0] = 0
-            for i in range(1, 3):
-                dSO3dt[i] = Q * (SO3[i-1] - SO3[i]) / V - kO3 * SO3[i]
-            dSO3dt[3] = 0
-            for i in range(4, 6):
-                dSO3dt[i] = Q * (SO3[i-1] - SO3[i]) / V - kO3 * SO3[i]        
-            dCcdt = list(range(n))
-            dCcdt[0] = Q * (Ccin - Cc[0]) / V - kD * Cc[0] * SO3[0]
-            for i in range(1, 6):
-                dCcdt[i] = Q * (Cc[i-1] - Cc[i]) / V - kD * Cc[i] * SO3[i]
-            return dSO3dt, dCcdt
-        
-        # Monte Carlo
-        results, mean, stddev = sh.MonteCarlo(model, var0, t=time, 
-                                              param=[Q, V, kO3, Ccin, kD], 
-                                              param_var0=[SO31, SO34])
-        
-        q = np.zeros(len(results))
-        for i in range(0, len(results)):
-            q[i] = results[i][-1]
+# Uncertainty, one sample per volume and outer run
+fuQ = rng.normal(1, 0.05, grid)             # Normally distributed
+fuV = rng.uniform(0.8, 1, grid)             # Randomly distributed 
+fuSO31 = rng.normal(1, 0.05, grid)          # Measuring error, normally distributed
+fuSO34 = rng.normal(1, 0.05, grid)          # SO4 is independent of SO1
+fukO3 = 1                                   # Uncertainty of kO3 is neglected
+fukD = 1                                    # Uncertainty of kD is neglected
+
+# Variation, evenly distributed, a Sobol sequence for each outer run
+fv = np.array([st.sample(var_runs, [('uniform', 0.9, 1.1),
+                                    ('uniform', 0.9, 1.1),
+                                    ('uniform', 0.7, 1.3),
+                                    ('uniform', 0.8, 1.2)], method='sobol', 
+                         seed=rng)
+               for i in range(len(Vtots)*uncer_runs)])
+fvSO31, fvSO34, fvkO3, fvkD = np.moveaxis(fv, 1, 0).reshape((4, len(Vtots), uncer_runs, 
+                                                             var_runs))
+
+Q = fuQ * 10000          # [m3d-1] Influent
+V = fuV * Vtot / n       # [m3] Active volume of a single reactor
+kO3 = 52 * fukO3 * fvkO3 # [d-1] Reaction constant for ozone decay at 5°C
+kD = 230 * fukD  * fvkD  # [m3g−1d−1] Reaction constant for disinfection at 5°C
+SO31 = fvSO31            # Controlled, remain constant
+SO34 = fvSO34            # Controlled, remain constant            
+
+# Parameters: Initial condition
+def var0(param_var0):
+    SO31, SO34 = param_var0
+    initSO3 = np.zeros(n)
+    initCc = np.zeros(n)
+    initSO3[0] = SO31
+    initSO3[3] = SO34
+    initSO3[1:3] = 1
+    initSO3[4:6] = 1
+    initCc[:] = 0.001   
+    return initSO3, initCc
+
+# Define ODE, vectorized: each state has a last axis for the runs
+def model(var, t, param, out):
+    SO3, Cc = var
+    Q, V, kO3, Ccin, kD = param   
+    dSO3dt, dCcdt = out
+    dSO3dt[0] = 0
+    dSO3dt[1:3] = Q * (SO3[0:2] - SO3[1:3]) / V - kO3 * SO3[1:3]
+    dSO3dt[3] = 0
+    dSO3dt[4:6] = Q * (SO3[3:5] - SO3[4:6]) / V - kO3 * SO3[4:6]
+    dCcdt[0] = Q * (Ccin - Cc[0]) / V - kD * Cc[0] * SO3[0]
+    dCcdt[1:6] = Q * (Cc[0:5] - Cc[1:6]) / V - kD * Cc[1:6] * SO3[1:6]
+
+# The checkpoint belongs to exactly these samples
+store = None
+if checkpoint is not None:
+    store = st.RunStore(checkpoint, dict(time=time, Q=Q, V=V, kO3=kO3, kD=kD, 
+                                         SO31=SO31, SO34=SO34))
 
-        res[v,u] = np.percentile(q,95)
+# Nested Monte Carlo, 95th percentile of the final state over the variation
+# for each volume and outer run
+res, halfwidth = st.nested(model, var0, t=time, param=[Q, V, kO3, Ccin, kD], 
+                           param_var0=[SO31, SO34], statistic=('percentile', 95), 
+                           store=store)
 
 sort = np.sort(res)
 F = np.array(range(uncer_runs))/((uncer_runs))
@@ -0,0 +1,231 @@
+import inspect
+import warnings
+import numpy as np
+import tqdm as tq
+from .convergence import confidence
+from .sharding import imap_chunks
+from .sol_ode import sol_ode, _inplace, _output_times
+from .stats import P2Quantile, RunningMoments
+
+def _samples(param, runs, index):
+
+    """
+    Selects the samples index of each parameter, constant parameters are kept.
+    """
+
+    return [np.asarray(item)[index] if np.ndim(item) > 0 else item for item in param]
+
+def _select(ydata, x_ind, blocks, runs_axis):
+
+    """
+    Selects the output of a run like sammhelper.MonteCarlo: the block x_ind
+    for models with several blocks and the last state of a cascade.
+    """
+
+    if blocks:
+        ydata = ydata[:, x_ind]
+    if ydata.ndim > 1 + runs_axis:
+        ydata = ydata[:, -1]
+    return ydata
+
+def _batch_model(model):
+
+    """
+    Wraps a vectorized model so that the runs are the first axis of the
+    states. The model itself sees the runs as last axis of each state.
+    """
+
+    if _inplace(model):
+        def batch(var, t, param, out):
+            model(np.moveaxis(var, 0, -1), t, param, np.moveaxis(out, 0, -1))
+    else:
+        def batch(var, t, param):
+            dvar = model(np.moveaxis(var, 0, -1), t, param)
+            return np.moveaxis(np.asarray(dvar, dtype=float), -1, 0)
+    return batch
+
+def _initial(var0, param_var0, runs, i, rng):
+
+    """
+    Returns the initial condition of run i, an initial condition function
+    with an argument rng gets the random number generator of the batch.
+    """
+
+    if param_var0 is None:
+        return var0
+    if 'rng' in inspect.signature(var0).parameters:
+        return var0(_samples(param_var0, runs, i), rng=rng)
+    return var0(_samples(param_var0, runs, i))
+
+def _blocks(model, var0, t, param, param_var0, runs):
+
+    """
+    Checks whether the results of a single run consist of several blocks.
+    """
+
+    y0 = _initial(var0, param_var0, runs, 0, np.random.default_rng())
+    if _inplace(model):
+        return isinstance(y0, (list, tuple)) and len(y0) > 1
+    p0 = _samples(param, runs, 0)
+    p0 = p0[0] if len(p0) == 1 else p0
+    return isinstance(model(np.asarray(y0, dtype=float), t[0], p0), tuple)
+
+def _run_chunk(model, var0, t, param, param_var0, x_ind, blocks, runs, index, ensemble,
+               seed_seq, t_ind, kwargs):
+
+    """
+    Solves the runs index, one after the other or together as an ensemble.
+    """
+
+    rng = np.random.default_rng(seed_seq)
+
+    if not ensemble:
+        results = []
+        for i in index:
+            ydata = sol_ode(model, _initial(var0, param_var0, runs, i, rng), t,
+                            _samples(param, runs, i), **kwargs)
+            if blocks:
+                ydata = np.stack(ydata, axis=1)
+            results.append(_select(ydata, x_ind, blocks, 0))
+        results = np.array(results)
+    else:
+        y0 = np.stack([np.asarray(_initial(var0, param_var0, runs, i, rng), dtype=float)
+                       for i in index])
+        # The states of a run are neighbours, the Jacobian is banded
+        size = y0[0].size
+        ydata = sol_ode(_batch_model(model), y0, t, _samples(param, runs, index),
+                        **{'band': (size-1, size-1), **kwargs})
+        ydata = np.moveaxis(ydata, 1, -1)
+        results = _select(ydata, x_ind, blocks, 1).T
+    return results[:, t_ind]
+
+def MonteCarlo(model, var0, t, param=None, param_var0=None, x_ind=-1, ensemble=False,
+               batch_size=None, workers=1, backend='auto', seed=None, t_ind=None,
+               stream=False, quantiles=None, tol=None, rtol=0, statistic='mean', level=0.95,
+               **kwargs):
+
+    """
+    Runs your model multiple times while varying the specified parameters.
+    Same interface and results as sammhelper.MonteCarlo.
+
+    With ensemble=True, all runs of a batch are solved together as one system.
+    The model must then be vectorized: each state is called with an additional
+    last axis for the runs, e.g. shape (n, runs) for a cascade of n reactors,
+    and the varied parameters are arrays of length runs.
+
+    The runs are split into batches of fixed size, which are distributed on
+    workers processes or threads. The results are returned in the order of
+    the samples and do not depend on the number of workers.
+
+    With stream=True, the results are not kept and None is returned in
+    their place. Mean and standard deviation are updated batch by batch and
+    the requested quantiles are estimated with the P-square algorithm, so
+    the memory does not grow with the number of runs. Together with t_ind,
+    e.g. t_ind=-1 for the final state, only the needed output times are
+    kept at all.
+
+    With tol, the runs are stopped as soon as the confidence interval of the
+    statistic is narrower than +-(tol + rtol*|value|) at all kept output
+    times. The samples in param and param_var0 are then the budget of runs,
+    which are used in order. A warning is issued if the budget is not
+    sufficient. The interval needs the results of all runs, so tol cannot
+    be combined with stream=True.
+
+    Args:
+        model (callable(var,t,param) or callable(var,t,param,out)): The function computes
+                                                                    the derivative of var at t.
+        var0 (array or callable(param_var0)): Initial condition of var or function returning it.
+        t (array): A sequence of time points for which to solve for var.
+        param (array, optional): Parameters used in the ODE model function, scalars or one sample per run,
+                                 e.g. the rows returned by sample.
+        param_var0 (array, optional): Parameters used in the initial condition function.
+        x_ind (int, optional): Index of the model output for the case of several outputs. Default is -1.
+        ensemble (bool, optional): Solve the runs of a batch together with a vectorized model.
+                                   Default is False.
+        batch_size (int, optional): Number of runs per batch. Default is all runs in ensemble mode
+                                    and 10 runs otherwise.
+        workers (int, optional): Number of parallel workers. Default is 1.
+        backend (str, optional): 'auto', 'process' or 'thread'. Default 'auto' uses threads
+                                 unless the start method is fork, see imap_chunks.
+        seed (int, optional): Seed of the random number generators passed as rng to an initial
+                              condition function var0(param_var0, rng), one per batch. The
+                              model itself must not draw random numbers. Default is None.
+        t_ind (int or array, optional): Indices of the output times to keep. Default is all times.
+        stream (bool, optional): Only keep running statistics instead of all results. Default is False.
+        quantiles (list, optional): Percentiles between 0 and 100 to estimate in stream mode.
+        tol (float, optional): Half width of the confidence interval at which the runs are stopped.
+        rtol (float, optional): Additional half width relative to the statistic. Default is 0.
+        statistic (str or tuple, optional): Statistic checked with tol: 'mean', ('percentile', q)
+                                            or ('exceedance', threshold). Default is 'mean'.
+        level (float, optional): Confidence level of the interval. Default is 0.95.
+        **kwargs: Further arguments passed to sol_ode, e.g. method, max_step or every.
+
+    Returns:
+        results (array): Results of all runs, one row per run. None in stream mode.
+        mean, stddev (array): Mean value and standard deviation of the results.
+        estimates (array): Only in stream mode with quantiles, the estimated quantiles, one
+                           row per quantile.
+        convergence (dict): Only with tol, the estimated statistic 'value', the 'halfwidth' of its
+                            confidence interval, the number of 'runs' and whether it 'converged'.
+    """
+
+    if stream and tol is not None:
+        raise ValueError('stream=True cannot be combined with tol, the confidence interval '
+                         'needs the results of all runs.')
+
+    print("Start Monte Carlo simulation...")
+
+    param = [] if param is None else list(param)
+    param_var0 = None if param_var0 is None else list(param_var0)
+    runs = max([len(item) for item in param+(param_var0 or []) if np.ndim(item) > 0]+[1])
+
+    blocks = _blocks(model, var0, t, param, param_var0, runs)
+
+    if batch_size is None:
+        batch_size = 10 if not ensemble else runs if tol is None else 100
+    chunks = [np.arange(start, min(start+batch_size, runs)) for start in range(0, runs, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    t_ind = slice(None) if t_ind is None else np.atleast_1d(t_ind)
+    tasks = [(model, var0, t, param, param_var0, x_ind, blocks, runs, index, ensemble, ss,
+              t_ind, kwargs) for index, ss in zip(chunks, seeds)]
+    solved = imap_chunks(_run_chunk, tasks, workers, backend)
+    chunk_results = tq.tqdm(solved, total=len(tasks))
+
+    if tol is not None:
+        results = []
+        for chunk in chunk_results:
+            results.append(chunk)
+            value, halfwidth = confidence(np.concatenate(results), statistic, level)
+            if np.all(halfwidth <= tol + rtol*np.abs(value)):
+                break
+        chunk_results.close()
+        solved.close()
+        results = np.concatenate(results)
+        converged = bool(np.all(halfwidth <= tol + rtol*np.abs(value)))
+        if not converged:
+            warnings.warn(f"Monte Carlo estimate not converged after {len(results)} runs, "
+                          f"half width of the confidence interval up to {np.max(halfwidth):.3g}")
+        convergence = {'value': value, 'halfwidth': halfwidth, 'runs': len(results),
+                       'converged': converged}
+        mean = np.mean(results, 0)
+        stddev = np.std(results, 0, ddof=1)
+        return results, mean, stddev, convergence
+
+    if not stream:
+        results = np.concatenate(list(chunk_results))
+        mean = np.mean(results, 0)
+        stddev = np.std(results, 0, ddof=1)
+        return results, mean, stddev
+
+    shape = (len(_output_times(t, kwargs.get('t_eval'), kwargs.get('every'))[t_ind]),)
+    moments = RunningMoments(shape)
+    sketches = [P2Quantile(p, shape) for p in (quantiles or [])]
+    for results in chunk_results:
+        moments.update(results)
+        for sketch in sketches:
+            sketch.update(results)
+
+    if not quantiles:
+        return None, moments.mean, moments.std()
+    estimates = np.array([sketch.value() for sketch in sketches])
+    return None, moments.mean, moments.std(), estimates
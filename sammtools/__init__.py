@@ -0,0 +1,29 @@
+from .particles import bottle_walk
+from .particles import walk_moments
+from .particles import walk_envelope
+from .particles import cascade_exit_steps
+from .particles import pfr_exit_steps
+from .particles import exit_histogram
+from .particles import exit_step_histogram
+from .particles import rtd_from_histogram
+from .sharding import imap_chunks
+from .sharding import map_chunks
+from .sharding import run_sharded
+from .sol_ode import sol_ode
+from .MonteCarlo import MonteCarlo
+from .stats import RunningMoments
+from .stats import P2Quantile
+from .sampling import sample
+from .sampling import mvsample
+from .convergence import confidence
+from .nested import nested
+from .checkpoint import config_hash
+from .checkpoint import RunStore
+from .sampling import compound_uniform
+from .stats import sample_histogram
+from .exposure import exposure
+from .exposure import damage_fraction
+from .stats import running_estimate
+from .sensitivity import sensitivity_matrix
+from .sensitivity import error_propagation
+from .linear import sol_linear
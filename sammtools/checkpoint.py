@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+def config_hash(config):
+
+    """
+    Computes a hash of the configuration of a study. Arrays are hashed by
+    their content and functions by their name.
+
+    Args:
+        config: Dictionary, list, array, function or value.
+
+    Returns:
+        key (str): Hexadecimal hash.
+    """
+
+    h = hashlib.sha256()
+
+    def add(value):
+        if isinstance(value, dict):
+            h.update(b'{')
+            for key in sorted(value, key=str):
+                add(key)
+                add(value[key])
+            h.update(b'}')
+        elif isinstance(value, (list, tuple)):
+            h.update(b'[')
+            for item in value:
+                add(item)
+            h.update(b']')
+        elif isinstance(value, np.ndarray):
+            h.update(f'{value.dtype}{value.shape}'.encode())
+            h.update(np.ascontiguousarray(value).tobytes())
+        elif callable(value):
+            h.update(f'{value.__module__}.{value.__qualname__}'.encode())
+        else:
+            h.update(repr(value).encode())
+
+    add(config)
+    return h.hexdigest()
+
+class RunStore:
+
+    """
+    Keeps partial aggregates of a long stochastic study, e.g. counts,
+    histograms, running moments and the state of the random number
+    generator, in a compact .npz file. The file is written at most every
+    interval seconds and replaced atomically, so an interrupted write never
+    destroys the last checkpoint. A new store with the same path and the
+    same config resumes from the file, a different config starts afresh.
+
+    Args:
+        path (str): File of the checkpoint, e.g. 'Table.07.02.npz'.
+        config (dict): Parameters that define the study, e.g. number of particles and seed.
+        interval (float, optional): Minimum time between two writes in seconds. Default is 60.
+    """
+
+    def __init__(self, path, config, interval=60):
+        self.path = path
+        self.key = config_hash(config)
+        self.interval = interval
+        self.written = time.monotonic()
+        self.data = {}
+        if os.path.exists(path):
+            with np.load(path) as stored:
+                if str(stored['_config']) == self.key:
+                    self.data = {name: stored[name] for name in stored.files if name != '_config'}
+        self.resumed = len(self.data) > 0
+        if self.resumed:
+            print(f"Resume from checkpoint {path}")
+
+    def get(self, name, default=None):
+
+        """
+        Returns the stored array name, or default if there is none.
+        """
+
+        return self.data.get(name, default)
+
+    def save(self, force=False, **arrays):
+
+        """
+        Updates the stored arrays and writes the file if interval has passed
+        since the last write or if force is True.
+        """
+
+        self.data.update({name: np.asarray(value) for name, value in arrays.items()})
+        if force or time.monotonic()-self.written >= self.interval:
+            self.write()
+
+    def write(self):
+
+        """
+        Writes all arrays to a temporary file and moves it over the checkpoint.
+        """
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as file:
+            np.savez(file, _config=np.array(self.key), **self.data)
+        os.replace(tmp, self.path)
+        self.written = time.monotonic()
+
+    def save_rng(self, name, rng):
+
+        """
+        Stores the state of a numpy.random.Generator, or of the global
+        generator of numpy.random if rng is the module numpy.random.
+        """
+
+        if rng is np.random:
+            state = np.random.get_state(legacy=False)
+        else:
+            state = rng.bit_generator.state
+        self.data[name] = np.array(json.dumps(state, default=lambda a: a.tolist()))
+
+    def load_rng(self, name, rng):
+
+        """
+        Restores the state of rng stored by save_rng, if there is one.
+
+        Returns:
+            restored (bool): Whether a state was restored.
+        """
+
+        if name not in self.data:
+            return False
+        state = json.loads(str(self.data[name]))
+        if 'key' in state['state']:
+            state['state']['key'] = np.array(state['state']['key'], dtype=np.uint32)
+        if rng is np.random:
+            np.random.set_state(state)
+        else:
+            rng.bit_generator.state = state
+        return True
+
+    def remove(self):
+
+        """
+        Deletes the checkpoint, e.g. once the study is complete.
+        """
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,54 @@
+import numpy as np
+import scipy.stats as stats
+
+def confidence(results, statistic='mean', level=0.95):
+
+    """
+    Estimates a statistic of Monte Carlo results and the half width of its
+    confidence interval, for each output time. The interval of the mean is
+    based on the normal distribution, the interval of a percentile on the
+    order statistics and the interval of an exceedance probability is the
+    Wilson score interval of the binomial distribution.
+
+    Args:
+        results (array): Results of the runs, one row per run.
+        statistic (str or tuple, optional): 'mean', ('percentile', q) with q between 0 and 100
+                                            or ('exceedance', threshold) for the probability
+                                            that the result is larger than threshold.
+                                            Default is 'mean'.
+        level (float, optional): Confidence level. Default is 0.95.
+
+    Returns:
+        value (array): Estimated statistic.
+        halfwidth (array): Half width of the confidence interval, inf if there are too few runs.
+    """
+
+    results = np.asarray(results, dtype=float)
+    kind, *args = (statistic,) if isinstance(statistic, str) else statistic
+    n = len(results)
+    z = stats.norm.ppf(0.5+level/2)
+
+    if kind == 'mean':
+        value = np.mean(results, 0)
+        if n < 2:
+            return value, np.full(value.shape, np.inf)
+        halfwidth = z*np.std(results, 0, ddof=1)/np.sqrt(n)
+    elif kind == 'percentile':
+        q, = args
+        value = np.percentile(results, q, axis=0)
+        # The number of results below the percentile is binomial
+        lower = int(stats.binom.ppf(0.5-level/2, n, q/100)) - 1
+        upper = int(stats.binom.ppf(0.5+level/2, n, q/100))
+        if lower < 0 or upper >= n:
+            return value, np.full(value.shape, np.inf)
+        ordered = np.sort(results, axis=0)
+        halfwidth = (ordered[upper]-ordered[lower])/2
+    elif kind == 'exceedance':
+        threshold, = args
+        p = np.mean(results > threshold, 0)
+        value = p
+        halfwidth = z/(1+z**2/n)*np.sqrt(p*(1-p)/n + z**2/(4*n**2))
+    else:
+        raise ValueError(f"Unknown statistic '{kind}', use 'mean', 'percentile' or 'exceedance'.")
+
+    return value, halfwidth
@@ -0,0 +1,42 @@
+import numpy as np
+
+def exposure(C0, k, t):
+
+    """
+    Computes the exposure to a pollutant whose concentration decays with
+    first order, C = C0*exp(-k*t), as the analytic integral of C from 0 to t
+    (Examples 12.16 and 15.5). C0 and k may hold one value per run.
+
+    Args:
+        C0 (float or array): Initial pollutant concentration.
+        k (float or array): Recession constant of the pollutant concentration.
+        t (float): Duration of the exposure.
+
+    Returns:
+        E (float or array): Exposure.
+    """
+
+    C0 = np.asarray(C0, dtype=float)
+    k = np.asarray(k, dtype=float)
+    # The limit k -> 0 of the integral is C0*t
+    kt = k*t
+    return C0*t*np.where(kt == 0, 1, -np.expm1(-kt)/np.where(kt == 0, 1, kt))
+
+def damage_fraction(E, Et):
+
+    """
+    Computes the fraction of individuals that are damaged by the exposure E,
+    i.e. whose tolerable exposure Et does not exceed E (Example 15.5). The
+    thresholds are sorted once, the fraction of each run is found by a binary
+    search.
+
+    Args:
+        E (float or array): Exposure, e.g. one value per run.
+        Et (array): Tolerable exposure of each individual.
+
+    Returns:
+        fraction (float or array): Fraction of damaged individuals for each exposure.
+    """
+
+    Et = np.sort(np.asarray(Et, dtype=float))
+    return np.searchsorted(Et, E, side='right')/len(Et)
@@ -0,0 +1,100 @@
+import numpy as np
+import scipy as sp
+
+def _propagator(A, b, h):
+
+    """
+    Returns the exact one-step matrices of dy/dt = A y + b u(t) over a step
+    h for an input u that is linear within the step: Phi for the state and
+    G1, G2 for the input and its slope, from the exponential of an augmented
+    matrix.
+    """
+
+    n, m = b.shape
+    M = np.zeros((n+2*m, n+2*m))
+    M[:n, :n] = A
+    M[:n, n:n+m] = b
+    M[n:n+m, n+m:] = np.eye(m)
+    E = sp.linalg.expm(M*h)
+    return E[:n, :n], E[:n, n:n+m], E[:n, n+m:]
+
+def _advance(Phi, w, y0):
+
+    """
+    Solves y[k+1] = Phi y[k] + w[k] for all k. The steps are grouped in
+    blocks of about sqrt(len(w)) steps: the responses within all blocks are
+    computed together, then the states at the block starts one by one.
+    """
+
+    n = len(y0)
+    m = max(1, int(np.sqrt(len(w))))
+    blocks = -(-len(w)//m)
+    W = np.zeros((blocks*m, n))
+    W[:len(w)] = w
+    W = W.reshape(blocks, m, n)
+
+    # Response within each block starting from zero, and powers of Phi
+    R = np.zeros((blocks, m+1, n))
+    P = np.empty((m+1, n, n))
+    P[0] = np.eye(n)
+    for i in range(m):
+        R[:, i+1] = R[:, i] @ Phi.T + W[:, i]
+        P[i+1] = Phi @ P[i]
+
+    starts = np.empty((blocks+1, n))
+    starts[0] = y0
+    for j in range(blocks):
+        starts[j+1] = P[m] @ starts[j] + R[j, m]
+
+    y = np.einsum('ikl,jl->jik', P[:m], starts[:-1]) + R[:, :m]
+    return np.vstack([y.reshape(-1, n), starts[-1:]])[:len(w)+1]
+
+def sol_linear(A, b, var0, t, u=None):
+
+    """
+    Solves a linear, time-invariant system of ODEs, dy/dt = A y + b u(t),
+    exactly. The propagator over a time step is computed once with the
+    matrix exponential, the solution is advanced by matrix products.
+    Without u, the input is constant, u = 1. An input sequence u given at
+    the time points t is interpolated linearly between them, as with
+    numpy.interp. The result does not depend on integrator tolerances.
+
+    Args:
+        A (array): System matrix, shape (n, n).
+        b (array): Input vector, shape (n,), or input matrix, shape (n, m).
+        var0 (array): Initial condition, n states in any shape.
+        t (array): A sequence of time points at which var is calculated.
+        u (array, optional): Input at each time point, shape (len(t),) or (len(t), m).
+                             Default is a constant input u = 1.
+
+    Returns:
+        ar (array): Array containing the value of var for each desired time in t, with the initial value var0 in the first row.
+    """
+
+    t = np.asarray(t, dtype=float)
+    A = np.asarray(A, dtype=float)
+    y0 = np.asarray(var0, dtype=float)
+    b = np.asarray(b, dtype=float).reshape(len(A), -1)
+    if u is None:
+        u = np.ones((len(t), b.shape[1]))
+    u = np.asarray(u, dtype=float).reshape(len(t), -1)
+
+    steps = np.diff(t)
+    if len(steps) == 0:
+        return y0.reshape((1,)+y0.shape)
+    y0 = y0.reshape(-1)
+
+    if np.allclose(steps, steps[0], rtol=1e-9, atol=0):
+        # Even grid: a single propagator, all steps advanced in blocks
+        h = steps[0]
+        Phi, G1, G2 = _propagator(A, b, h)
+        w = u[:-1] @ G1.T + np.diff(u, axis=0)/h @ G2.T
+        y = _advance(Phi, w, y0)
+    else:
+        y = np.zeros((len(t), len(y0)))
+        y[0] = y0
+        for k, h in enumerate(steps):
+            Phi, G1, G2 = _propagator(A, b, h)
+            y[k+1] = Phi @ y[k] + G1 @ u[k] + G2 @ (u[k+1]-u[k])/h
+
+    return y.reshape((len(t),)+np.shape(var0))
@@ -0,0 +1,108 @@
+import numpy as np
+import tqdm as tq
+from .convergence import confidence
+from .MonteCarlo import _blocks, _run_chunk
+from .sharding import imap_chunks
+
+def nested(model, var0, t, param=None, param_var0=None, statistic=('percentile', 95),
+           level=0.95, x_ind=-1, t_ind=-1, ensemble=True, batch_size=1024, workers=1,
+           backend='auto', store=None, **kwargs):
+
+    """
+    Runs a nested Monte Carlo simulation over a grid of designs, samples of
+    the uncertain parameters and samples of the variable parameters, e.g.
+    the three loops of Table 15.6. The parameters are arrays that broadcast
+    to the grid shape (designs, uncertainty, variability), or scalars. All
+    runs are flattened and solved in batches of whole variability groups,
+    each group is reduced to the statistic as soon as its batch is solved,
+    so only the reduced results are kept.
+
+    With a RunStore, the reduced results of the completed batches are saved
+    periodically and a rerun continues after the last saved batch. The
+    samples must then be the same, e.g. drawn with a fixed seed.
+
+    Args:
+        model (callable(var,t,param) or callable(var,t,param,out)): The function computes
+                                                                    the derivative of var at t.
+        var0 (array or callable(param_var0)): Initial condition of var or function returning it.
+        t (array): A sequence of time points for which to solve for var.
+        param (array, optional): Parameters used in the ODE model function, scalars or arrays
+                                 broadcasting to the grid shape.
+        param_var0 (array, optional): Parameters used in the initial condition function.
+        statistic (str or tuple, optional): Statistic of the variability, see confidence.
+                                            Default is ('percentile', 95).
+        level (float, optional): Confidence level of the half width. Default is 0.95.
+        x_ind (int, optional): Index of the model output for the case of several outputs. Default is -1.
+        t_ind (int, optional): Index of the output time. Default is -1, the final state.
+        ensemble (bool, optional): Solve the runs of a batch together with a vectorized model,
+                                   see MonteCarlo. Default is True.
+        batch_size (int, optional): Number of runs per batch, rounded down to whole variability
+                                    groups. Default is 1024.
+        workers (int, optional): Number of parallel workers. Default is 1.
+        backend (str, optional): 'auto', 'process' or 'thread', see imap_chunks.
+                                 Default is 'auto'.
+        store (RunStore, optional): Checkpoint of the study. Default is None.
+        **kwargs: Further arguments passed to sol_ode, e.g. method or max_step.
+
+    Returns:
+        res (array): Statistic for each design and sample of the uncertainty.
+        halfwidth (array): Half width of the confidence interval of each value of res.
+    """
+
+    print("Start nested Monte Carlo simulation...")
+
+    param = [] if param is None else list(param)
+    param_var0 = None if param_var0 is None else list(param_var0)
+    shape = np.broadcast_shapes(*[np.shape(item) for item in param+(param_var0 or [])])
+    if len(shape) != 3:
+        raise ValueError(f"The parameters must broadcast to (designs, uncertainty, variability), "
+                         f"not {shape}.")
+    groups = shape[0]*shape[1]
+    var_runs = shape[2]
+    runs = groups*var_runs
+
+    # Flat samples of all runs, constant parameters are kept
+    def flatten(items):
+        return [np.broadcast_to(item, shape).reshape(-1) if np.ndim(item) > 0 else item
+                for item in items]
+    param = flatten(param)
+    param_var0 = None if param_var0 is None else flatten(param_var0)
+
+    blocks = _blocks(model, var0, t, param, param_var0, runs)
+    per_batch = max(1, batch_size//var_runs)
+    chunks = [np.arange(start*var_runs, min(start+per_batch, groups)*var_runs)
+              for start in range(0, groups, per_batch)]
+    t_ind = np.atleast_1d(t_ind)
+
+    # Each task only gets the samples of its batch
+    def piece(items, index):
+        if items is None:
+            return None
+        return [item[index[0]:index[-1]+1] if np.ndim(item) > 0 else item for item in items]
+    tasks = [(model, var0, t, piece(param, index), piece(param_var0, index), x_ind, blocks,
+              len(index), np.arange(len(index)), ensemble, None, t_ind, kwargs)
+             for index in chunks]
+
+    done = 0
+    res = np.zeros(groups)
+    halfwidth = np.zeros(groups)
+    if store is not None and store.get('done') is not None:
+        done = int(store.get('done'))
+        res[:] = store.get('res')
+        halfwidth[:] = store.get('halfwidth')
+
+    solved = tq.tqdm(imap_chunks(_run_chunk, tasks[done:], workers, backend),
+                     total=len(tasks), initial=done)
+    for results, index in zip(solved, chunks[done:]):
+        # Reduce each variability group of the batch
+        for j, group in enumerate(range(index[0]//var_runs, (index[-1]+1)//var_runs)):
+            value, width = confidence(results[j*var_runs:(j+1)*var_runs, 0], statistic, level)
+            res[group] = value
+            halfwidth[group] = width
+        done += 1
+        if store is not None:
+            store.save(done=done, res=res, halfwidth=halfwidth)
+    if store is not None:
+        store.write()
+
+    return res.reshape(shape[:2]), halfwidth.reshape(shape[:2])
@@ -0,0 +1,259 @@
+import numpy as np
+from .sharding import run_sharded
+
+def bottle_walk(n, nt, Dx, dB, hB, hF, xmin, xmax, rng=None):
+
+    """
+    Simulates the random walk of particles diffusing out of a bottle with a
+    neck (Example 4.11). All particles are advanced together with one batched
+    draw per time step, the geometry of bottle and neck is applied with
+    boolean masks.
+
+    Args:
+        n (int): Number of particles.
+        nt (int): Number of time steps, including the initial state.
+        Dx (float): Standard deviation of a single step in x and y.
+        dB (float): Diameter of the bottle.
+        hB (float): Height of the bottle without the neck.
+        hF (float): Height of the bottle including the neck.
+        xmin (float): Start of the bottle neck along the x-axis.
+        xmax (float): End of the bottle neck along the x-axis.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+
+    Returns:
+        n_in (array): Number of particles still in the bottle at each time step.
+        x, y (array): Final coordinates of all particles.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # Particles are spread evenly over the volume of bottle and neck
+    nF = int(n*dB*hB/(dB*hB+(xmax-xmin)*(hF-hB)))
+    x = np.empty(n)
+    y = np.empty(n)
+    x[0:nF] = rng.random(nF)*dB
+    x[nF:n] = xmin + rng.random(n-nF)*(xmax-xmin)
+    y[0:nF] = rng.random(nF)*hB
+    y[nF:n] = hB + rng.random(n-nF)*(hF-hB)
+
+    n_in = np.zeros(nt, dtype=np.int64)
+    n_in[0] = np.count_nonzero(y < hF)
+
+    step = np.empty((2, n))
+    for i in range(1, nt):
+        rng.standard_normal(out=step)
+        x_new = x + Dx*step[0]
+        y_new = y + Dx*step[1]
+        # A step is accepted if it ends inside the bottle or inside the neck
+        inside = np.where(y_new < hB, (x_new > 0) & (x_new < dB),
+                          (x_new > xmin) & (x_new < xmax))
+        np.copyto(x, x_new, where=inside)
+        # Particles that left through the neck or hit the bottom stay put
+        np.copyto(y, y_new, where=inside & (y <= hF) & (y_new >= 0))
+        n_in[i] = np.count_nonzero(y < hF)
+
+    return n_in, x, y
+
+def walk_moments(n, nt, sigma, rng=None, max_block=10**6):
+
+    """
+    Simulates n independent one-dimensional random walks starting at 0 and
+    sums their positions and squared positions for each time step. The
+    increments are drawn in blocks of particles x steps with at most
+    max_block elements, the trajectories are never stored as a whole.
+
+    Args:
+        n (int): Number of particles.
+        nt (int): Number of time steps, including the initial state.
+        sigma (float): Standard deviation of a single step.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+        max_block (int, optional): Maximum number of increments drawn at once. Default is 10**6.
+
+    Returns:
+        s1 (array): Sum of the positions at each time step.
+        s2 (array): Sum of the squared positions at each time step.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    s1 = np.zeros(nt)
+    s2 = np.zeros(nt)
+    block = max(1, max_block//max(n, 1))
+    pos = np.zeros((n, 1))
+    for i in range(1, nt, block):
+        steps = min(block, nt-i)
+        # Positions of all particles in this block of time steps
+        walk = np.cumsum(sigma*rng.standard_normal((n, steps)), axis=1) + pos
+        s1[i:i+steps] = walk.sum(axis=0)
+        s2[i:i+steps] = (walk**2).sum(axis=0)
+        pos = walk[:, -1:]
+
+    return s1, s2
+
+def walk_envelope(n, nt, sigma, seed=None, workers=1, shard_size=100000, backend='auto'):
+
+    """
+    Computes the mean and the standard deviation of the position of n random
+    walks for each time step. The particles are simulated in shards with
+    run_sharded, only the moments of the positions are kept.
+
+    Args:
+        n (int): Number of particles.
+        nt (int): Number of time steps, including the initial state.
+        sigma (float): Standard deviation of a single step.
+        seed (int, optional): Seed of the simulation. Default is None (not reproducible).
+        workers (int, optional): Number of parallel processes. Default is 1.
+        shard_size (int, optional): Number of particles per shard. Default is 100000.
+        backend (str, optional): 'auto', 'process' or 'thread', see run_sharded.
+                                 Default is 'auto'.
+
+    Returns:
+        mean (array): Mean position at each time step.
+        std (array): Standard deviation of the position at each time step.
+    """
+
+    s1, s2 = run_sharded(walk_moments, n, seed=seed, workers=workers,
+                         shard_size=shard_size, backend=backend, nt=nt, sigma=sigma)
+    mean = s1/n
+    std = np.sqrt(np.maximum(s2/n - mean**2, 0))
+    return mean, std
+
+def cascade_exit_steps(nP, nR, p, method='geometric', rng=None):
+
+    """
+    Samples the time step in which particles leave a cascade of nR stirred
+    tank reactors (Table 7.2). The holding time in each compartment is
+    geometric with probability p per time step, the exit step of a particle
+    is therefore drawn directly as the sum of nR holding times.
+
+    Args:
+        nP (int): Number of particles.
+        nR (int): Number of reactors in series.
+        p (float): Probability that a particle leaves a compartment in one time step.
+        method (str, optional): 'geometric' reproduces the discrete model exactly,
+                                'exponential' uses the continuous holding times
+                                with the same mean. Default is 'geometric'.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+
+    Returns:
+        steps (array): Index of the time step in which each particle reaches the effluent.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if method == 'geometric':
+        # nR successes plus the failed trials before the nR-th success
+        steps = nR + rng.negative_binomial(nR, p, nP)
+    elif method == 'exponential':
+        # Sum of nR exponential holding times with mean 1/p time steps
+        steps = np.ceil(rng.gamma(nR, 1/p, nP)).astype(np.int64)
+    else:
+        raise ValueError(f"Unknown method '{method}', use 'geometric' or 'exponential'.")
+
+    return steps
+
+def pfr_exit_steps(nP, nt, L, u, sig, DT, rng=None):
+
+    """
+    Tracks particles in a turbulent plug-flow reactor with a random walk
+    (Table 7.3). Only the current positions of the particles still in the
+    reactor are kept, particles reaching the outlet are absorbed and their
+    exit step is recorded.
+
+    Args:
+        nP (int): Number of particles.
+        nt (int): Number of time steps, including the initial state.
+        L (float): Length of the reactor.
+        u (float): Flow velocity, advection.
+        sig (float): Standard deviation of the random step.
+        DT (float): Time step.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+
+    Returns:
+        steps (array): Index of the time step in which each particle reaches
+                       the effluent, nt for particles still in the reactor.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    steps = np.full(nP, nt, dtype=np.int64)
+    # Particles still in the reactor and their positions
+    active = np.arange(nP)
+    x = np.zeros(nP)
+
+    for i in range(1, nt):
+        if len(active) == 0:
+            break
+        xnew = x + rng.normal(u*DT, sig, len(x))
+        # Steps across the inlet are rejected (closed boundary)
+        np.copyto(x, xnew, where=xnew >= 0)
+        # Particles beyond the outlet are absorbed in the effluent
+        out = x > L
+        steps[active[out]] = i
+        active = active[~out]
+        x = x[~out]
+
+    return steps
+
+def exit_histogram(steps, nt):
+
+    """
+    Counts the particles reaching the effluent in each time step.
+
+    Args:
+        steps (array): Index of the time step in which each particle leaves the reactor.
+        nt (int): Number of time steps. Later exits are not counted.
+
+    Returns:
+        counts (array): Number of particles leaving the reactor in each time step.
+    """
+
+    steps = np.asarray(steps)
+    return np.bincount(steps[steps < nt], minlength=nt)
+
+def exit_step_histogram(nP, sampler, args, nt, rng=None):
+
+    """
+    Samples the exit steps of nP particles and counts them per time step.
+    Used to run the samplers in shards with run_sharded.
+
+    Args:
+        nP (int): Number of particles.
+        sampler (callable(nP, *args, rng)): Sampler of the exit steps, e.g. cascade_exit_steps.
+        args (tuple): Further arguments of the sampler.
+        nt (int): Number of time steps.
+        rng (numpy.random.Generator, optional): Random number generator.
+
+    Returns:
+        counts (array): Number of particles leaving the reactor in each time step.
+    """
+
+    return exit_histogram(sampler(nP, *args, rng=rng), nt)
+
+def rtd_from_histogram(counts, nP, DT):
+
+    """
+    Computes the cumulative and the differential residence time distribution
+    from the histogram of the exit steps.
+
+    Args:
+        counts (array): Number of particles leaving the reactor in each time step.
+        nP (int): Total number of particles.
+        DT (float): Time step.
+
+    Returns:
+        F (array): Fraction of particles in the effluent, cumulative RTD.
+        f (array): Residence time distribution.
+    """
+
+    F = np.cumsum(counts)/nP
+    f = counts/(nP*DT)
+    return F, f
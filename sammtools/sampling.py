@@ -0,0 +1,180 @@
+import numpy as np
+import scipy.stats as stats
+from scipy.stats import qmc
+
+def _uniform(n, d, method, seed):
+
+    """
+    Draws n points of the unit hypercube in d dimensions.
+    """
+
+    if method == 'random':
+        return np.random.default_rng(seed).random((n, d))
+    elif method == 'lhs':
+        engine = qmc.LatinHypercube(d, seed=seed)
+    elif method == 'sobol':
+        engine = qmc.Sobol(d, scramble=True, seed=seed)
+    elif method == 'halton':
+        engine = qmc.Halton(d, scramble=True, seed=seed)
+    else:
+        raise ValueError(f"Unknown method '{method}', use 'random', 'lhs', 'sobol' or 'halton'.")
+    return engine.random(n)
+
+def _factor(cov):
+
+    """
+    Returns L with L @ L.T = cov. Cholesky factorization, or for matrices
+    that are not numerically positive definite, the square root of the
+    eigen decomposition with negative eigenvalues set to zero.
+    """
+
+    cov = np.asarray(cov, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        w, V = np.linalg.eigh(cov)
+        return V*np.sqrt(np.maximum(w, 0))
+
+def _ppf(marginal, u):
+
+    """
+    Maps uniform numbers u through the inverse distribution function of marginal.
+    """
+
+    kind, *args = marginal
+    if kind == 'normal':
+        mu, sig = args
+        return stats.norm.ppf(u, mu, sig)
+    elif kind == 'uniform':
+        low, high = args
+        return low + u*(high-low)
+    elif kind == 'lognormal':
+        # Mean and standard deviation of the parameter itself, as in Example 11.2
+        mu, sig = args
+        if mu <= 0:
+            raise ValueError(f"The mean of a lognormal marginal must be positive, not {mu}.")
+        mu_ln = np.log(mu**2/(sig**2 + mu**2)**0.5)
+        sig_ln = (np.log(1+sig**2/mu**2))**0.5
+        return np.exp(stats.norm.ppf(u, mu_ln, sig_ln))
+    elif kind == 'triangular':
+        low, mode, high = args
+        return stats.triang.ppf(u, (mode-low)/(high-low), low, high-low)
+    elif kind == 'truncnorm':
+        mu, sig, low, high = args
+        return stats.truncnorm.ppf(u, (low-mu)/sig, (high-mu)/sig, mu, sig)
+    else:
+        raise ValueError(f"Unknown marginal '{kind}'.")
+
+def sample(n, marginals, method='random', corr=None, seed=None):
+
+    """
+    Draws n samples of uncertain parameters with pseudo-random numbers, a
+    Latin hypercube or a scrambled Sobol or Halton sequence. Quasi-random
+    designs fill the parameter space more evenly, so that statistics of the
+    model results converge with fewer runs. The number of samples of a Sobol
+    sequence should be a power of 2.
+
+    The samples are correlated with a Gaussian copula: the uniform numbers
+    are transformed to standard normal numbers, correlated with the Cholesky
+    factor of corr and transformed back before the marginals are applied.
+
+    Args:
+        n (int): Number of samples.
+        marginals (list): Distribution of each parameter as a tuple:
+                          ('normal', mu, sig), ('uniform', low, high),
+                          ('lognormal', mu, sig) with positive mean and standard deviation,
+                          ('triangular', low, mode, high) or ('truncnorm', mu, sig, low, high).
+        method (str, optional): 'random', 'lhs', 'sobol' or 'halton'. Default is 'random'.
+        corr (array, optional): Correlation matrix of the parameters. Default is None (independent).
+        seed (int, optional): Seed of the random numbers or of the scrambling. Default is None.
+
+    Returns:
+        samples (array): Samples with one row per parameter, e.g. for param of MonteCarlo.
+    """
+
+    d = len(marginals)
+    u = _uniform(n, d, method, seed)
+    # Unbounded marginals need u strictly between 0 and 1
+    eps = np.finfo(float).eps
+    u = np.clip(u, eps, 1-eps)
+
+    if corr is not None:
+        L = _factor(corr)
+        u = stats.norm.cdf(stats.norm.ppf(u) @ L.T)
+
+    return np.array([_ppf(marginal, u[:, i]) for i, marginal in enumerate(marginals)])
+
+def mvsample(n, mean, cov=None, corr=None, std=None, marginals='normal', method='random',
+             seed=None):
+
+    """
+    Draws n samples of correlated parameters with given means and covariance
+    matrix, or correlation matrix and standard deviations. The matrix is
+    factorized once, so millions of samples are drawn in one call. Normal
+    parameters are correlated exactly, other marginals with the Gaussian
+    copula of sample.
+
+    Args:
+        n (int): Number of samples.
+        mean (array): Mean of each parameter.
+        cov (array, optional): Covariance matrix of the parameters.
+        corr (array, optional): Correlation matrix of the parameters, used with std instead of cov.
+        std (array, optional): Standard deviation of each parameter, used with corr.
+        marginals (str or list, optional): 'normal', 'lognormal' or 'uniform' for all parameters
+                                           or for each parameter, 'lognormal' only for a
+                                           positive mean. Default is 'normal'.
+        method (str, optional): 'random', 'lhs', 'sobol' or 'halton', see sample. Default is 'random'.
+        seed (int, optional): Seed of the random numbers or of the scrambling. Default is None.
+
+    Returns:
+        samples (array): Samples with one row per parameter, e.g. for param of MonteCarlo.
+    """
+
+    mean = np.asarray(mean, dtype=float)
+    if cov is not None:
+        cov = np.asarray(cov, dtype=float)
+        std = np.sqrt(np.diag(cov))
+        corr = cov/np.outer(std, std)
+    std = np.asarray(std, dtype=float)
+    d = len(mean)
+    if isinstance(marginals, str):
+        marginals = [marginals]*d
+
+    if all(kind == 'normal' for kind in marginals):
+        if method == 'random':
+            z = np.random.default_rng(seed).standard_normal((n, d))
+        else:
+            eps = np.finfo(float).eps
+            z = stats.norm.ppf(np.clip(_uniform(n, d, method, seed), eps, 1-eps))
+        return mean[:, None] + std[:, None]*(_factor(corr) @ z.T)
+
+    bounds = {'uniform': lambda mu, sig: ('uniform', mu-3**0.5*sig, mu+3**0.5*sig)}
+    marginals = [bounds[kind](mu, sig) if kind in bounds else (kind, mu, sig)
+                 for kind, mu, sig in zip(marginals, mean, std)]
+    return sample(n, marginals, method=method, corr=corr, seed=seed)
+
+def compound_uniform(n, low, high, rng=None):
+
+    """
+    Draws n values of a uniform distribution with uncertain limits (Example
+    15.13). For each value, the lower and the upper limit are drawn first
+    from uniform distributions, then the value between these limits. All
+    draws are vectorized.
+
+    Args:
+        n (int): Number of values.
+        low (tuple): Range (min, max) of the uniformly distributed lower limit.
+        high (tuple): Range (min, max) of the uniformly distributed upper limit.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+
+    Returns:
+        values (array): Random values.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    lo = rng.uniform(low[0], low[1], n)
+    hi = rng.uniform(high[0], high[1], n)
+    return lo + rng.random(n)*(hi-lo)
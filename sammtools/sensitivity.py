@@ -0,0 +1,86 @@
+import numpy as np
+from .MonteCarlo import _blocks, _run_chunk
+
+def sensitivity_matrix(model, var0, t, param, pars, param_var0=None, delta=1e-4, x_ind=-1,
+                       ensemble=True, **kwargs):
+
+    """
+    Computes the absolute-relative sensitivity of the results of the model
+    to several parameters in a single call, S_j(t) = p_j * dy/dp_j, with
+    the finite difference of sammhelper.sensitivity. The unperturbed run
+    and one run per perturbed parameter are solved together as one ensemble,
+    so that all runs share the same time steps.
+
+    Args:
+        model (callable(var,t,param) or callable(var,t,param,out)): The function computes
+                                                                    the derivative of var at t.
+                                                                    Vectorized as for
+                                                                    MonteCarlo with ensemble=True.
+        var0 (array or callable(param_var0)): Initial condition of var or function returning it.
+        t (array): A sequence of time points for which to solve for var.
+        param (array): Parameters used in the ODE model function.
+        pars (list): Parameters for the sensitivity, ('param', i) for param[i] or
+                     ('param_var0', i) for param_var0[i], one column each.
+        param_var0 (array, optional): Parameters used in the initial condition function.
+        delta (float, optional): Relative perturbation of the parameters. Default is 1e-4.
+        x_ind (int, optional): Index of the model output for the case of several outputs. Default is -1.
+        ensemble (bool, optional): Solve all runs as one system with a vectorized model. With
+                                   False, the runs are solved one after the other. Default is True.
+        **kwargs: Further arguments passed to sol_ode, e.g. method or max_step.
+
+    Returns:
+        sens (array): Sensitivity matrix, one row per time point and one column per parameter.
+        y (array): Results of the unperturbed run.
+    """
+
+    values = {'param': list(param), 'param_var0': None if param_var0 is None else list(param_var0)}
+    runs = len(pars)+1
+    samples = {name: None if items is None else list(items) for name, items in values.items()}
+
+    # Run 0 is unperturbed, run j+1 perturbs the parameter j, the other
+    # parameters remain scalars
+    steps = np.zeros(len(pars))
+    for j, (name, i) in enumerate(pars):
+        p = values[name][i]
+        steps[j] = delta*abs(p) if p != 0 else delta
+        if np.ndim(samples[name][i]) == 0:
+            samples[name][i] = np.full(runs, float(p))
+        samples[name][i][j+1] = p + steps[j]
+
+    blocks = _blocks(model, var0, t, samples['param'], samples['param_var0'], runs)
+    results = _run_chunk(model, var0, t, samples['param'], samples['param_var0'], x_ind, blocks,
+                         runs, np.arange(runs), ensemble, None, slice(None), kwargs)
+
+    p = np.array([values[name][i] for name, i in pars], dtype=float)
+    sens = p*(results[1:]-results[0]).T/steps
+    return sens, results[0]
+
+def error_propagation(sens, cov, std=None):
+
+    """
+    Propagates the uncertainty of the parameters linearly to the model
+    results (Eq. 12.37), sigma^2(t) = s(t) cov s(t)^T for the row s(t) of
+    the sensitivity matrix, for all time points at once.
+
+    Args:
+        sens (array): Sensitivity dy/dp, one row per time point and one column per parameter.
+        cov (array): Covariance matrix of the parameters.
+        std (array, optional): Standard errors of the parameters for the propagation without
+                               covariance. Default is the square root of the diagonal of cov.
+
+    Returns:
+        sigma_w (array): Standard deviation of the results with covariance.
+        sigma_wo (array): Standard deviation of the results without covariance.
+        contrib (array): Contribution of each parameter to the variance with covariance,
+                         the rows sum to sigma_w**2.
+    """
+
+    sens = np.asarray(sens, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    if std is None:
+        std = np.sqrt(np.diag(cov))
+
+    contrib = sens*(sens @ cov)
+    sigma_w = np.sqrt(np.sum(contrib, axis=1))
+    sigma_wo = np.sqrt(np.sum((sens*std)**2, axis=1))
+    return sigma_w, sigma_wo, contrib
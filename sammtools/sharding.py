@@ -0,0 +1,174 @@
+import collections
+import concurrent.futures
+import multiprocessing
+import warnings
+import numpy as np
+
+def _run_shard(func, size, seed_seq, kwargs):
+    return func(size, rng=np.random.default_rng(seed_seq), **kwargs)
+
+def imap_chunks(func, tasks, workers=1, backend='auto'):
+
+    """
+    Applies func to each task, in parallel if workers > 1, and yields the
+    results in the order of the tasks. At most 2*workers tasks are pending,
+    so results can be reduced while the next tasks are running. Closing the
+    generator early cancels the pending tasks.
+
+    With spawn or forkserver, the start methods on Windows and macOS, each
+    new process imports the main script again, which fails for scripts
+    without an if __name__ == '__main__' guard. backend='auto' therefore
+    only uses processes with the start method fork, the default on Linux,
+    and threads otherwise. Scripts with the guard can use backend='process'.
+
+    Args:
+        func (callable(*task)): Function applied to each task.
+        tasks (list): Arguments of func for each task, as tuples.
+        workers (int, optional): Number of parallel workers. Default is 1.
+        backend (str, optional): 'auto', 'process' or 'thread'. Threads only help if
+                                 func releases the GIL. Default is 'auto'.
+
+    Yields:
+        Result of func for each task.
+    """
+
+    if workers == 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    if backend == 'auto':
+        backend = 'process'
+        if multiprocessing.get_start_method() != 'fork':
+            warnings.warn(f"The start method '{multiprocessing.get_start_method()}' imports the "
+                          f"main script in each process, threads are used instead. Scripts "
+                          f"with an if __name__ == '__main__' guard can use backend='process'.")
+            backend = 'thread'
+
+    if backend == 'process':
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    elif backend == 'thread':
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    else:
+        raise ValueError(f"Unknown backend '{backend}', use 'auto', 'process' or 'thread'.")
+
+    with executor:
+        pending = collections.deque()
+        try:
+            for task in tasks:
+                pending.append(executor.submit(func, *task))
+                if len(pending) >= 2*workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Tasks not yet started are dropped if the caller stops early
+            for future in pending:
+                future.cancel()
+
+def map_chunks(func, tasks, workers=1, backend='auto'):
+
+    """
+    Applies func to each task, in parallel if workers > 1, and returns the
+    results in the order of the tasks.
+
+    Args:
+        func (callable(*task)): Function applied to each task.
+        tasks (list): Arguments of func for each task, as tuples.
+        workers (int, optional): Number of parallel workers. Default is 1.
+        backend (str, optional): 'auto', 'process' or 'thread', see imap_chunks.
+                                 Default is 'auto'.
+
+    Returns:
+        results (list): Result of func for each task.
+    """
+
+    return list(imap_chunks(func, tasks, workers, backend))
+
+def _merge(merged, result, kind):
+    if kind == 'sum':
+        return merged + result
+    return np.concatenate([merged, result])
+
+def run_sharded(func, n, seed=None, workers=1, shard_size=100000, merge=None, store=None,
+                backend='auto', **kwargs):
+
+    """
+    Splits a population of n particles into shards, simulates the shards
+    in a pool of processes and merges the results. Each shard draws from its
+    own random number generator spawned from the seed. The shards only depend
+    on n, seed and shard_size, the results are therefore identical for any
+    number of workers.
+
+    On Windows and macOS, new processes import the main script again. With
+    the default backend='auto', the shards then run on threads, which only
+    help if func releases the GIL. Scripts with an
+    if __name__ == '__main__' guard can use backend='process' instead.
+
+    With a RunStore, the merged result of the completed shards is saved
+    periodically. A rerun with the same store continues after the last
+    saved shard, with the same random numbers as an uninterrupted run.
+
+    Args:
+        func (callable(size, rng, ...)): Simulates a shard of size particles with the
+                                         generator rng and returns an array or a tuple of arrays.
+        n (int): Total number of particles.
+        seed (int, optional): Seed of the simulation. Default is None (not reproducible).
+        workers (int, optional): Number of parallel processes. Default is 1.
+        shard_size (int, optional): Number of particles per shard. Default is 100000.
+        merge (tuple, optional): 'sum' or 'concat' for each element of the result of func.
+                                 Default is 'sum' for all elements.
+        store (RunStore, optional): Checkpoint of the study. Default is None.
+        backend (str, optional): 'auto', 'process' or 'thread', see imap_chunks.
+                                 Default is 'auto'.
+        **kwargs: Further arguments passed to func.
+
+    Returns:
+        Merged result with the same structure as the result of func.
+    """
+
+    if n <= 0:
+        raise ValueError(f"The number of particles must be positive, not {n}.")
+    sizes = [shard_size]*(n//shard_size)
+    if n % shard_size > 0:
+        sizes.append(n % shard_size)
+
+    done = 0
+    merged = None
+    entropy = None
+    if store is not None:
+        if store.get('done') is not None:
+            done = int(store.get('done'))
+            single = bool(store.get('single'))
+            merged = [store.get(f'part{i}') for i in range(int(store.get('parts')))]
+        if store.get('entropy') is not None:
+            # An unseeded study continues with the random numbers it started with
+            entropy = int(str(store.get('entropy')))
+    seed_seq = np.random.SeedSequence(seed if entropy is None else entropy)
+    seeds = seed_seq.spawn(len(sizes))
+    if store is not None:
+        store.save(entropy=str(seed_seq.entropy))
+
+    # Merge the shards in their fixed order
+    tasks = [(func, size, ss, kwargs) for size, ss in zip(sizes, seeds)][done:]
+    for result in imap_chunks(_run_shard, tasks, workers, backend):
+        single = not isinstance(result, tuple)
+        if single:
+            result = (result,)
+        if merge is None:
+            merge = ('sum',)*len(result)
+        for kind in merge:
+            if kind not in ('sum', 'concat'):
+                raise ValueError(f"Unknown merge '{kind}', use 'sum' or 'concat'.")
+        if merged is None:
+            merged = [np.asarray(part) for part in result]
+        else:
+            merged = [_merge(m, part, kind) for m, part, kind in zip(merged, result, merge)]
+        done += 1
+        if store is not None:
+            store.save(done=done, single=single, parts=len(merged),
+                       **{f'part{i}': part for i, part in enumerate(merged)})
+    if store is not None:
+        store.write()
+
+    return merged[0] if single else tuple(merged)
@@ -0,0 +1,446 @@
+import inspect
+import numpy as np
+import scipy as sp
+from .linear import sol_linear
+
+def _spectral_radius(fun, t0, y0, f0, iterations=20):
+
+    """
+    Estimates the largest magnitude of the eigenvalues of the Jacobian of
+    fun at (t0, y0) by a power iteration on finite difference products.
+    """
+
+    v = np.random.default_rng(0).standard_normal(len(y0))
+    v = v/np.linalg.norm(v)
+    rho = 0
+    for i in range(iterations):
+        h = np.sqrt(np.finfo(float).eps)*max(1, np.linalg.norm(y0))
+        w = (fun(t0, y0+h*v)-f0)/h
+        rho = np.linalg.norm(w)
+        if rho == 0:
+            break
+        v = w/rho
+    return rho
+
+def _inplace(model, args=4):
+
+    """
+    Checks whether model has the in-place signature model(var, t, param, out),
+    or model(var, z, t, param, out) with args=5. Parameters with a default
+    value, e.g. model(var, t, param, scale=1.0), are not counted.
+    """
+
+    kinds = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    params = inspect.signature(model).parameters.values()
+    required = [p for p in params if p.kind in kinds and p.default is inspect.Parameter.empty]
+    return len(required) >= args
+
+def _algebraic(algebraic, z0, param, shape, rtol, atol):
+
+    """
+    Returns a function z(y, t) that solves algebraic(var, z, t, param) = 0
+    for z by a Newton iteration, starting from the previous solution. The
+    Jacobian with respect to z is computed by finite differences and reused
+    as long as the residual decreases quickly.
+    """
+
+    zshape = np.shape(z0)
+    z = np.asarray(z0, dtype=float).reshape(-1)
+    lu = None
+
+    def residual(y, z, t):
+        return np.asarray(algebraic(y.reshape(shape), z.reshape(zshape), t, param),
+                          dtype=float).reshape(-1)
+
+    def solve(y, t):
+        nonlocal z, lu
+        zn = z.copy()
+        r = residual(y, zn, t)
+        for i in range(40):
+            if lu is None:
+                J = np.zeros((len(zn), len(zn)))
+                for j in range(len(zn)):
+                    h = np.sqrt(np.finfo(float).eps)*max(1, abs(zn[j]))
+                    dz = np.zeros(len(zn))
+                    dz[j] = h
+                    J[:, j] = (residual(y, zn+dz, t)-r)/h
+                lu = sp.linalg.lu_factor(J)
+            step = sp.linalg.lu_solve(lu, r)
+            zn = zn-step
+            if np.all(np.abs(step) <= 0.01*(atol+rtol*np.abs(zn))):
+                z = zn
+                return zn.reshape(zshape)
+            previous = np.linalg.norm(r)
+            r = residual(y, zn, t)
+            if np.linalg.norm(r) > 0.5*previous:
+                # Slow convergence, the Jacobian is updated
+                lu = None
+        raise RuntimeError(f'The algebraic equations did not converge at t = {t}.')
+
+    return solve
+
+def _band_sparsity(n, band):
+    lband, uband = band
+    return sp.sparse.diags([np.ones(n-abs(k)) for k in range(-lband, uband+1)],
+                           list(range(-lband, uband+1)), shape=(n, n))
+
+def _linearize(fun, t, y0):
+
+    """
+    Determines A and the input c(t) of a linear model fun(t, y) = A y + c(t)
+    numerically and checks that the model is linear with a constant A.
+    """
+
+    n = len(y0)
+    c = np.array([fun(time, np.zeros(n)) for time in t])
+    A = np.column_stack([fun(t[0], e)-c[0] for e in np.eye(n)])
+
+    # Check at the initial state and at a random state at the end
+    scale = max(1, np.max(np.abs(y0)))
+    y1 = scale*np.random.default_rng(0).standard_normal(n)
+    for k, y in ((0, y0), (-1, y1)):
+        f = fun(t[k], y)
+        expected = A @ y + c[k]
+        tol = 1e-6*(np.abs(A) @ np.abs(y) + np.abs(c[k])) + 1e-12
+        if np.any(np.abs(f-expected) > tol):
+            raise ValueError('The model is not linear in var with constant coefficients, '
+                             'use linear=False.')
+    return A, c
+
+def _output_times(t, t_eval=None, every=None):
+
+    """
+    Returns the output times of sol_ode for the time points t.
+    """
+
+    t = np.asarray(t if t_eval is None else t_eval, dtype=float)
+    return t if every is None else t[::every]
+
+def sol_ode(model, var0, t, param, method='auto', band=None, jac_sparsity=None,
+            max_step=None, rtol=1.49012e-8, atol=1.49012e-8, linear=False, tswitch=None,
+            events=None, t_eval=None, every=None, states=None, snapshots=None, observer=None,
+            algebraic=None, z0=None):
+
+    """
+    Solves a system of ordinary differential equations (ODEs). Same interface
+    and results as sammhelper.sol_ode, with the choice of the integration
+    method and the structure of the Jacobian for stiff systems.
+
+    The model can also write the derivatives into a buffer with the shape of
+    var0, model(var, t, param, out), instead of returning them. The buffer
+    is reused for all evaluations, so every element must be written. For such
+    models, a var0 given as a list of several states or blocks of states
+    returns a list, like a model returning a tuple.
+
+    With linear=True, the model must be linear in var with constant
+    coefficients, dvar/dt = A var + c(t). A and c are determined from
+    evaluations of the model and the system is solved exactly with
+    sol_linear, c(t) is interpolated linearly between the time points.
+
+    Switches in the model, e.g. if t <= tair, are declared with tswitch and
+    events. The integration stops at each switching time and restarts
+    from the state reached. Between two switching times, the model sees the
+    time only from inside the interval. For example, a model switching on
+    t <= 15 uses the first branch up to t = 15 and the second branch after
+    it. A state event stops the integration where event(var, t, param)
+    changes its sign. The integration restarts from there, with the model
+    deciding the new branch from the state, e.g. V > Vmin. Each event stops
+    the integration at most once between two switching times, so that it
+    does not fire again while the state stays at the threshold. The steps
+    are then no longer limited by the switches, so a larger max_step can be
+    used.
+
+    The results are returned at the times in t, or only at t_eval or at
+    every k-th of them, in the given order. The integrator interpolates
+    between its own steps. These are still limited to the time step of t,
+    so that inputs of the model, e.g. a time series read with np.interp,
+    are resolved as before, and with linear=True c(t) is sampled at all
+    times in t. For models without such inputs, a larger max_step lets the
+    steps follow the dynamics instead of t. With states, only the selected
+    states are kept.
+
+    With snapshots, the full states are also returned at the snapshot
+    times, e.g. the profiles of a column at several times. One integration
+    runs to the latest snapshot, even beyond t[-1].
+
+    Derived quantities, e.g. an equilibrium concentration, are computed
+    by an observer(var, t, param) at the output times only, instead of
+    being integrated as additional states.
+
+    With algebraic, the system is a semi-explicit index-1 DAE: the model
+    model(var, z, t, param) or model(var, z, t, param, out) depends on
+    algebraic variables z, which fulfil algebraic(var, z, t, param) = 0.
+    At each evaluation of the model, z is solved by a Newton iteration
+    starting from the previous solution, beginning with the guess z0.
+    The observer is then called as observer(var, z, t, param).
+
+    Args:
+        model (callable(var,t,param) or callable(var,t,param,out)): The function computes
+                                                                    the derivative of var at t.
+        var0 (array): Initial condition of var.
+        t (array): A sequence of time points at which var is calculated.
+        param (array): Model parameters.
+        method (str, optional): 'odeint' (LSODA as in sammhelper) or a method of
+                                scipy.integrate.solve_ivp, e.g. 'BDF' or 'Radau'. Default 'auto'
+                                uses odeint, or BDF if the system is stiff.
+        band (tuple, optional): Lower and upper band width (lband, uband) of the Jacobian,
+                                e.g. (1, 1) for a tridiagonal cascade of reactors.
+        jac_sparsity (array, optional): Sparsity pattern of the Jacobian, element (i, j) is
+                                        nonzero if the derivative of state i depends on state j.
+                                        States are numbered in the order of var0 flattened.
+        max_step (float, optional): Maximum step size. Default is the time step of t, also
+                                    for BDF chosen by method='auto'.
+        rtol, atol (float, optional): Relative and absolute tolerance. Default as in odeint.
+        linear (bool, optional): Solve a linear model exactly with the matrix exponential.
+                                 Default is False.
+        tswitch (array, optional): Times at which the model switches, e.g. [tair].
+        events (callable(var,t,param) or list, optional): Functions whose sign changes where
+                                                          the model switches, e.g. V - Vmin. An
+                                                          attribute direction restricts the
+                                                          crossings as for solve_ivp. With odeint,
+                                                          the intervals with events are solved
+                                                          with LSODA of solve_ivp.
+        t_eval (array, optional): Output times within t[0] and t[-1], in any order.
+                                  Default is t.
+        every (int, optional): Keep only every k-th output time, e.g. 10.
+        states (array, optional): Indices of the states to keep, numbered in the order of
+                                  var0 flattened. The result is then an array with one
+                                  column per selected state.
+        snapshots (array, optional): Times at which the full states are returned in addition.
+        observer (callable(var,t,param), optional): Function returning derived quantities,
+                                                    called at the output times.
+        algebraic (callable(var,z,t,param), optional): Residual of the algebraic equations
+                                                       of a DAE, with the shape of z0.
+        z0 (array, optional): Initial guess of the algebraic variables, required with algebraic.
+
+    Returns:
+        ar (array): Array containing the value of var for each desired time in t, with the initial value var0 in the first row.
+        snaps (array): Only with snapshots, the value of var at each snapshot time, a list of
+                       arrays for a var0 with several blocks.
+        z (array): Only with algebraic, the value of z for each output time.
+        obs (array): Only with observer, the value of the observer for each output time, a
+                     list of arrays for an observer returning a tuple.
+    """
+
+    t = np.asarray(t, dtype=float)
+    if isinstance(param, list):
+        if len(param) == 1:
+            param = param[0]
+
+    y0 = np.asarray(var0, dtype=float)
+    shape = y0.shape
+
+    if algebraic is not None:
+        # The model of the DAE is evaluated with the solution z of the
+        # algebraic equations
+        if z0 is None:
+            raise ValueError('An initial guess z0 is required with algebraic.')
+        solve_z = _algebraic(algebraic, z0, param, shape, rtol, atol)
+        dae = model
+        if _inplace(dae, 5):
+            def model(var, t, param, out):
+                dae(var, solve_z(var, t), t, param, out)
+        else:
+            def model(var, t, param):
+                return dae(var, solve_z(var, t), t, param)
+
+    if _inplace(model):
+        blocks = isinstance(var0, (list, tuple)) and len(var0) > 1
+        buffer = np.zeros(shape)
+
+        def rhs(time, y):
+            model(y.reshape(shape), time, param, buffer)
+            return buffer.reshape(-1)
+
+        def fun(time, y):
+            return rhs(time, y).copy()
+    else:
+        blocks = isinstance(model(y0, t[0], param), tuple)
+
+        def fun(time, y):
+            return np.asarray(model(y.reshape(shape), time, param), dtype=float).reshape(-1)
+        rhs = fun
+
+    if max_step is None:
+        max_step = t[1]-t[0]
+    grid = t
+
+    # The integration runs over t to the output times
+    t_out = _output_times(t, t_eval, every)
+    if np.any(t_out < t[0]) or np.any(t_out > t[-1]):
+        raise ValueError('The output times must lie within t[0] and t[-1].')
+    snapshots = np.atleast_1d(np.asarray([] if snapshots is None else snapshots, dtype=float))
+    if np.any(snapshots < t[0]):
+        raise ValueError('The snapshots must not lie before t[0].')
+    t = np.unique(np.concatenate([t[[0, -1]], t_out, snapshots]))
+    rows = np.searchsorted(t, t_out)
+    snap_rows = np.searchsorted(t, snapshots)
+    keep = slice(None) if states is None else np.asarray(states)
+
+    if method == 'auto':
+        method = 'odeint'
+        if not linear:
+            # Implicit solver if explicit steps of the time step of t are unstable,
+            # a larger max_step must be given explicitly
+            y = y0.reshape(-1)
+            rho = _spectral_radius(fun, t[0], y, fun(t[0], y))
+            if rho*min(max_step, grid[1]-grid[0]) > 3:
+                method = 'BDF'
+
+    if events is None:
+        events = []
+    elif callable(events):
+        events = [events]
+    if events and linear:
+        raise ValueError('Events are not supported with linear=True, use tswitch.')
+    conditions = []
+    for event in events:
+        def condition(time, y, event=event):
+            return event(y.reshape(shape), time, param)
+        condition.terminal = True
+        condition.direction = getattr(event, 'direction', 0)
+        conditions.append(condition)
+
+    options = {}
+    if method in ('BDF', 'Radau'):
+        if band is not None:
+            jac_sparsity = _band_sparsity(y0.size, band)
+        if jac_sparsity is not None:
+            options['jac_sparsity'] = jac_sparsity
+    elif method in ('LSODA', 'odeint') and band is not None:
+        options['lband'], options['uband'] = band
+
+    def segment(fun, rhs, times, y, active):
+        # Solution at times[1:], or up to the first event: values, event time and index
+        if linear:
+            # The input is sampled at all time points of the grid in between
+            fine = np.union1d(times, grid[(grid > times[0]) & (grid < times[-1])])
+            pick = np.searchsorted(fine, times[1:])
+            A, c = _linearize(fun, fine, y)
+            if np.all(c == c[0]):
+                return sol_linear(A, c[0], y, fine)[pick], None, None
+            return sol_linear(A, np.eye(len(A)), y, fine, u=c)[pick], None, None
+        if method == 'odeint' and not active:
+            # LSODA switches between non-stiff and stiff methods, the default
+            # number of steps between two output times is allowed per max_step
+            lband, uband = band if band is not None else (None, None)
+            mxstep = 500*max(1, int(np.ceil(np.max(np.diff(times))/max_step)))
+            y = sp.integrate.odeint(rhs, y, times, hmax=max_step, rtol=rtol, atol=atol,
+                                    ml=lband, mu=uband, mxstep=mxstep, tfirst=True)
+            return y[1:], None, None
+        sol = sp.integrate.solve_ivp(fun, (times[0], times[-1]), y,
+                                     method='LSODA' if method == 'odeint' else method,
+                                     t_eval=times[1:], max_step=max_step, rtol=rtol,
+                                     atol=atol, events=[conditions[i] for i in active],
+                                     **options)
+        if not sol.success:
+            raise RuntimeError(f'Integration failed: {sol.message}')
+        values = np.reshape(sol.y, (len(y), -1)).T
+        if sol.status == 1:
+            i = next(i for i, te in enumerate(sol.t_events) if len(te) > 0)
+            # Restart just past the crossing, so that the model sees the new side,
+            # the state is moved there by a tiny Euler step
+            condition = conditions[active[i]]
+            before = np.sign(condition(times[0], y))
+            te, ye = sol.t_events[i][0], sol.y_events[i][0]
+            slope = fun(te, ye)
+            step = np.spacing(te)
+            while (np.sign(condition(te+step, ye+step*slope)) == before
+                   and step < 1e-6*(times[-1]-times[0])):
+                step *= 2
+            return values, (te, ye, slope, te+step), active[i]
+        return values, None, None
+
+    # Intervals between the switching times inside the time span, a switch
+    # within close of a time point is moved onto it
+    close = 1e-10*(t[-1]-t[0])
+    tswitch = np.asarray([] if tswitch is None else tswitch, dtype=float)
+    near = np.clip(np.searchsorted(t, tswitch), 1, len(t)-1)
+    near = np.where(t[near]-tswitch < tswitch-t[near-1], near, near-1)
+    tswitch = np.where(np.abs(t[near]-tswitch) <= close, t[near], tswitch)
+    tswitch = np.unique(tswitch[(tswitch > t[0]) & (tswitch < t[-1])])
+    ends = np.append(tswitch, t[-1])
+    y = np.zeros((len(t), y0.size if states is None else len(keep)))
+    snaps = np.zeros((len(snapshots), y0.size))
+    zs = [None]*len(t_out)
+    obs = [None]*len(t_out)
+
+    def store(k, values):
+        # Keeps the states from the time point k on
+        y[k:k+len(values)] = values[:, keep]
+        for i in np.flatnonzero((snap_rows >= k) & (snap_rows < k+len(values))):
+            snaps[i] = values[snap_rows[i]-k]
+        if algebraic is None and observer is None:
+            return
+        for i in np.flatnonzero((rows >= k) & (rows < k+len(values))):
+            var = values[rows[i]-k].reshape(shape)
+            if algebraic is not None:
+                zs[i] = solve_z(var, t[rows[i]]).copy()
+                if observer is not None:
+                    obs[i] = observer(var, zs[i], t[rows[i]], param)
+            else:
+                obs[i] = observer(var, t[rows[i]], param)
+
+    state = y0.reshape(-1)
+    store(0, state[np.newaxis])
+    start = t[0]
+    k = 1
+    for begin, end in zip(np.append(t[0], ends[:-1]), ends):
+        # The model sees the time inside the interval
+        lo = begin if begin == t[0] else np.nextafter(begin, end)
+        hi = end if end == t[-1] else np.nextafter(end, begin)
+        if lo == begin and hi == end:
+            seg_fun, seg_rhs = fun, rhs
+        else:
+            def seg_fun(time, y, lo=lo, hi=hi):
+                return fun(min(max(time, lo), hi), y)
+
+            def seg_rhs(time, y, lo=lo, hi=hi):
+                return rhs(min(max(time, lo), hi), y)
+
+        active = list(range(len(events)))
+        while start < end:
+            j = np.searchsorted(t, end, side='right')
+            times = np.concatenate([[start], t[k:j], [end] if t[j-1] < end else []])
+            values, stop, fired = segment(seg_fun, seg_rhs, times, state, active)
+            if stop is None:
+                store(k, values[:j-k])
+                state = values[-1]
+                start = end
+                k = j
+            else:
+                # Time points up to the restart are moved along the slope at the event
+                te, ye, slope, restart = stop
+                m = np.searchsorted(t, restart+close, side='right')
+                store(k, values)
+                if m > k+len(values):
+                    restart = max(restart, t[m-1])
+                    store(k+len(values), ye+np.outer(t[k+len(values):m]-te, slope))
+                state = ye+(restart-te)*slope
+                active.remove(fired)
+                start = restart
+                k = m
+
+    y = y[rows]
+    if states is not None:
+        ar = y
+    elif blocks:
+        results = y.reshape((len(t_out),)+shape)
+        ar = [results[:, i] for i in range(shape[0])]
+    else:
+        ar = y.reshape((len(t_out),)+shape)
+
+    extra = []
+    if len(snapshots) > 0:
+        snaps = snaps.reshape((len(snapshots),)+shape)
+        extra.append([snaps[:, i] for i in range(shape[0])] if blocks else snaps)
+    if algebraic is not None:
+        extra.append(np.array(zs))
+    if observer is not None:
+        if isinstance(obs[0], tuple):
+            extra.append([np.array(item) for item in zip(*obs)])
+        else:
+            extra.append(np.array(obs))
+    if not extra:
+        return ar
+    return (ar, *extra)
@@ -0,0 +1,193 @@
+import numpy as np
+
+class RunningMoments:
+
+    """
+    Mean and variance of a stream of results, updated batch by batch with
+    the method of Welford and Chan. Only the current moments are stored.
+
+    Args:
+        shape (tuple): Shape of a single result, e.g. (len(t),).
+    """
+
+    def __init__(self, shape):
+        self.n = 0
+        self.mean = np.zeros(shape)
+        self.M2 = np.zeros(shape)
+
+    def update(self, values):
+
+        """
+        Adds a batch of results, one result per row.
+        """
+
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean(axis=0)
+        M2 = ((values-mean)**2).sum(axis=0)
+        delta = mean-self.mean
+        total = self.n+n
+        self.mean = self.mean + delta*n/total
+        self.M2 = self.M2 + M2 + delta**2*self.n*n/total
+        self.n = total
+
+    def std(self, ddof=1):
+
+        """
+        Returns the standard deviation of the results added so far.
+        """
+
+        return np.sqrt(self.M2/(self.n-ddof))
+
+class P2Quantile:
+
+    """
+    Estimates a quantile of a stream of results with the P-square algorithm
+    of Jain and Chlamtac (1985). Five markers are kept for each element of a
+    result, the memory does not grow with the number of results.
+
+    Args:
+        percentile (float): Percentile to estimate, between 0 and 100 as in numpy.percentile.
+        shape (tuple): Shape of a single result, e.g. (len(t),).
+    """
+
+    def __init__(self, percentile, shape):
+        p = percentile/100
+        self.shape = shape
+        self.first = []
+        self.q = None
+        self.n = np.tile(np.arange(5.0).reshape((5,)+(1,)*len(shape)), (1,)+tuple(shape))
+        self.nd = np.tile(np.array([0, 2*p, 4*p, 2+2*p, 4]).reshape((5,)+(1,)*len(shape)),
+                          (1,)+tuple(shape))
+        self.dn = np.array([0, p/2, p, (1+p)/2, 1]).reshape((5,)+(1,)*len(shape))
+        self.percentile = percentile
+
+    def update(self, values):
+
+        """
+        Adds a batch of results, one result per row.
+        """
+
+        for x in np.asarray(values, dtype=float):
+            if self.q is None:
+                self.first.append(x)
+                if len(self.first) == 5:
+                    self.q = np.sort(np.array(self.first), axis=0)
+                continue
+            self._add(x)
+
+    def _add(self, x):
+        q, n = self.q, self.n
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        # Cell of x between the markers, positions of the markers above move
+        k = np.sum(x >= q[1:4], axis=0)
+        n += np.arange(5).reshape((5,)+(1,)*x.ndim) > k
+        self.nd = self.nd + self.dn
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in range(1, 4):
+                d = self.nd[i]-n[i]
+                s = np.where((d >= 1) & (n[i+1]-n[i] > 1), 1,
+                             np.where((d <= -1) & (n[i-1]-n[i] < -1), -1, 0))
+                # Parabolic prediction of the marker height, linear if not monotonic
+                qp = q[i] + s/(n[i+1]-n[i-1])*((n[i]-n[i-1]+s)*(q[i+1]-q[i])/(n[i+1]-n[i])
+                                                + (n[i+1]-n[i]-s)*(q[i]-q[i-1])/(n[i]-n[i-1]))
+                qn = np.where(s > 0, q[i+1], q[i-1])
+                nn = np.where(s > 0, n[i+1], n[i-1])
+                ql = q[i] + s*(qn-q[i])/(nn-n[i])
+                qi = np.where((q[i-1] < qp) & (qp < q[i+1]), qp, ql)
+                q[i] = np.where(s != 0, qi, q[i])
+                n[i] += s
+
+    def value(self):
+
+        """
+        Returns the estimated quantile of the results added so far.
+        """
+
+        if self.q is None:
+            return np.percentile(np.array(self.first), self.percentile, axis=0)
+        return self.q[2].copy()
+
+def sample_histogram(n, sampler, args, edges, rng=None, max_block=10**6):
+
+    """
+    Draws n values with sampler in blocks of at most max_block values and
+    counts them in fixed bins, the values are never stored as a whole.
+    Values outside the bins are not counted. With run_sharded, the counts of
+    many shards are summed to the histogram of 10^8 or more values.
+
+    Args:
+        n (int): Number of values.
+        sampler (callable(n, *args, rng)): Sampler of the values, e.g. compound_uniform.
+        args (tuple): Further arguments of the sampler.
+        edges (array): Edges of the bins.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+        max_block (int, optional): Maximum number of values drawn at once. Default is 10**6.
+
+    Returns:
+        counts (array): Number of values in each bin.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    counts = np.zeros(len(edges)-1, dtype=np.int64)
+    for start in range(0, n, max_block):
+        values = sampler(min(max_block, n-start), *args, rng=rng)
+        counts += np.histogram(values, edges)[0]
+    return counts
+
+def running_estimate(sampler, n, args=(), points=1000, rng=None, max_block=10**6):
+
+    """
+    Estimates the mean of the values drawn by sampler, e.g. the hits of a
+    hit-or-miss estimator, and follows the estimate as more samples are
+    added. The values are drawn in blocks of at most max_block, the running
+    sums are kept with cumulative sums. The running estimate and its
+    standard error are only reported for about points sample sizes,
+    spaced logarithmically, to keep the convergence curve plottable.
+
+    Args:
+        sampler (callable(n, *args, rng)): Draws n values.
+        n (int): Total number of samples.
+        args (tuple, optional): Further arguments of the sampler.
+        points (int, optional): Number of reported sample sizes. Default is 1000.
+        rng (numpy.random.Generator, optional): Random number generator.
+                                                Default is a fresh generator.
+        max_block (int, optional): Maximum number of values drawn at once. Default is 10**6.
+
+    Returns:
+        trials (array): Number of samples at each reported point, ending with n.
+        estimate (array): Running mean of the values.
+        stderr (array): Standard error of the running mean, nan for a single sample.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    trials = np.unique(np.geomspace(1, n, points).astype(np.int64))
+    trials[-1] = n
+    estimate = np.zeros(len(trials))
+    stderr = np.zeros(len(trials))
+    s1 = 0.0
+    s2 = 0.0
+    for start in range(0, n, max_block):
+        size = min(max_block, n-start)
+        values = np.asarray(sampler(size, *args, rng=rng), dtype=float)
+        c1 = s1 + np.cumsum(values)
+        c2 = s2 + np.cumsum(values**2)
+        # Reported points within this block
+        sel = (trials > start) & (trials <= start+size)
+        N = trials[sel]
+        estimate[sel] = c1[N-start-1]/N
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.maximum(c2[N-start-1]/N - estimate[sel]**2, 0)*N/(N-1)
+            stderr[sel] = np.sqrt(var/N)
+        s1 = c1[-1]
+        s2 = c2[-1]
+
+    return trials, estimate, stderr